@@ -0,0 +1,286 @@
+import numpy as np
+from tensor import LocatedTensor
+
+
+class BitTensor:
+    """
+    the class implements binary (0 or 1) N dimensional tensor with location,
+    values are packed into bits along the last axis (8 cells in each byte), so it's 64 times smaller than int tensor
+    """
+
+    binary = True  # it keeps only 0 and 1, so it can't be used with lifetime rules
+
+    # ----------------- Class creators ----------------- #
+
+    def __init__(self, corner, dim, packed=None):
+        """
+        :param corner: (tuple) vector of the lower left corner of the tensor location in N dimensional space
+        :param dim: (tuple) shape of the unpacked tensor
+        :param packed: (ndarray) values packed by np.packbits along the last axis
+        """
+        assert isinstance(corner, tuple), "Init exception: arg corner must be a TUPLE"
+        assert isinstance(dim, tuple), "Init exception: arg dim must be a TUPLE"
+        assert len(corner) == len(dim), "Init exception: LEN of corner and LEN of dim must be equal"
+        self.__corner = np.array(corner)
+        self.__dim = tuple(int(size) for size in dim)
+        packed_dim = self.__dim[:-1] + ((self.__dim[-1] + 7) // 8,)
+        self.__packed = np.zeros(packed_dim, dtype=np.uint8) if packed is None else packed
+        assert self.__packed.shape == packed_dim, "Init exception: SHAPE of packed doesn't match dim"
+
+    @classmethod
+    def zeros(cls, corner=None, *, dim):
+        """ alternative creator of empty tensor """
+        if corner is None:
+            corner = tuple(np.zeros(len(dim)).astype(int))  # set default value if it's necessary
+        return cls(corner, tuple(dim))
+
+    @classmethod
+    def from_tensor(cls, tensor):
+        """ alternative creator from the LocatedTensor (all not null values turn to 1) """
+        return cls(tuple(tensor.corner), tensor.dim, np.packbits(tensor[:] != 0, axis=-1))
+
+    @classmethod
+    def rules_from_tensor(cls, tensor):
+        """ rules are kept as packed mask for each code """
+        return BitRules.from_tensor(tensor)
+
+    def to_tensor(self):
+        """ convert to the LocatedTensor """
+        value = np.unpackbits(self.__packed, axis=-1, count=self.dim[-1])  # uint8
+        return LocatedTensor(tuple(self.corner), value, copy=False)
+
+    # ----------------- Values ----------------- #
+
+    def get_global(self, point, default=None):
+        """
+        access to tensor's value (getter) BY GLOBAL POINT
+        return default if point is out of range (handling not exists exception)
+        """
+        local_point = np.array(self.point_to_local(point))
+        point_is_within = ((0 <= local_point) & (local_point < np.array(self.dim))).all()
+        if not point_is_within:
+            return default
+        byte = self.__packed[tuple(local_point[:-1]) + (local_point[-1] // 8,)]
+        return int(byte >> (7 - local_point[-1] % 8)) & 1
+
+    def set_global(self, point, value):
+        """
+        access to tensor's value (setter) BY GLOBAL POINT, all not null values turn to 1
+        return ERROR if point is out of range (no handling not exists exception)
+        """
+        local_point = self.point_to_local(point)
+        key = tuple(local_point[:-1]) + (local_point[-1] // 8,)
+        bit = np.uint8(1 << (7 - local_point[-1] % 8))
+        if value != 0:
+            self.__packed[key] |= bit
+        else:
+            self.__packed[key] &= ~bit
+
+    # ----------------- Points ----------------- #
+
+    def point_to_local(self, point):
+        """ to get a local location of the global point """
+        return tuple(np.array(point) - self.corner)
+
+    def point_to_global(self, point):
+        """ to get a global location of the local point """
+        return tuple(np.array(point) + self.corner)
+
+    @property
+    def not_null_points_local(self):
+        """ all points with not null values (LOCAL POINTS) """
+        return self.to_tensor().not_null_points_local
+
+    @property
+    def not_null_points_global(self):
+        """ all points with not null values (GLOBAL POINTS) """
+        return [self.point_to_global(point) for point in self.not_null_points_local]
+
+    # ----------------- Attributes ----------------- #
+
+    @property
+    def dim(self):
+        """ shortcut for the shape (of the unpacked tensor) """
+        return self.__dim
+
+    @property
+    def ndim(self):
+        """ shortcut for the number of dimensional """
+        return len(self.__dim)
+
+    @property
+    def corner(self):
+        """ shortcut for corner (left-bottom) param """
+        return self.__corner
+
+    @property
+    def opp_corner(self):
+        """ vector of the opposite corner (right-top) of the tensor """
+        return self.corner + self.dim - 1
+
+    @property
+    def packed(self):
+        """ packed values (8 cells along the last axis in each byte) """
+        return self.__packed
+
+    # ----------------- Bitwise arithmetic ----------------- #
+
+    @staticmethod
+    def __shift(packed, axis, step):
+        """
+        shift packed values by one cell along the axis: step 1 means cell x gets value of cell x - 1,
+        step -1 means cell x gets value of cell x + 1, cells coming from outside are zero
+        """
+        result = np.zeros_like(packed)
+        if axis < packed.ndim - 1:  # whole bytes are moved
+            source = [slice(None)] * packed.ndim
+            target = [slice(None)] * packed.ndim
+            source[axis] = slice(0, -1) if step == 1 else slice(1, None)
+            target[axis] = slice(1, None) if step == 1 else slice(0, -1)
+            result[tuple(target)] = packed[tuple(source)]
+        elif step == 1:  # bits are moved to the lower bit, the lowest bit of the previous byte becomes the highest
+            result[..., 1:] = packed[..., :-1] << 7
+            result |= packed >> 1
+        else:  # bits are moved to the higher bit, the highest bit of the next byte becomes the lowest
+            result[..., :-1] = packed[..., 1:] >> 7
+            result |= packed << 1
+        return result
+
+    @staticmethod
+    def __add(planes_a, planes_b):
+        """ ripple-carry adder of the numbers given by bit planes (the lowest bit first) """
+        size = max(len(planes_a), len(planes_b))
+        zeros = np.zeros_like(planes_a[0])
+        planes_a = planes_a + [zeros] * (size - len(planes_a))
+        planes_b = planes_b + [zeros] * (size - len(planes_b))
+        result, carry = [], zeros
+        for a, b in zip(planes_a, planes_b):
+            half = a ^ b
+            result.append(half ^ carry)
+            carry = (a & b) | (carry & half)
+        return result + [carry]
+
+    def __count_planes(self):
+        """
+        bit planes of the count of the alive cells in 3 ** ndim area (include the cell itself!),
+        it's separable sum: 3 shifted planes are added along each axis in turn
+        """
+        planes = [self.__packed]
+        for axis in range(self.ndim):
+            shifted_back = [self.__shift(plane, axis, -1) for plane in planes]
+            shifted_forward = [self.__shift(plane, axis, 1) for plane in planes]
+            planes = self.__add(self.__add(shifted_back, planes), shifted_forward)
+            planes = planes[:(3 ** (axis + 1)).bit_length()]  # the highest planes are always zero
+        return planes
+
+    @staticmethod
+    def __equal(planes, number):
+        """ packed mask of the cells which count is equal to the number """
+        result = np.full_like(planes[0], 0xFF)
+        for i, plane in enumerate(planes):
+            result &= plane if (number >> i) & 1 else ~plane
+        return result
+
+    # ----------------- Math Operations ----------------- #
+
+    def num_alive(self):
+        """ count the number of the alive neighbors (include diagonal neighbors!), returns LocatedTensor """
+        total = sum(np.unpackbits(plane, axis=-1, count=self.dim[-1]) << i
+                    for i, plane in enumerate(self.__count_planes()))
+        alive = np.unpackbits(self.__packed, axis=-1, count=self.dim[-1])
+        count_dtype = LocatedTensor.count_dtype(self.ndim)
+        return LocatedTensor(tuple(self.corner), (total - alive).astype(count_dtype), copy=False)
+
+    def next_life(self, rules, next_cell_func):
+        """
+        apply cellular automata rules to tensor and return next tensor state,
+        birth and survive tables of each code are taken from next_cell_func and applied by bitwise logic
+        """
+
+        if isinstance(rules, int):
+            tensor_rules = BitRules.full(tuple(self.corner), self.dim, rules)
+        elif isinstance(rules, BitRules):
+            tensor_rules = rules
+        elif isinstance(rules, LocatedTensor):
+            tensor_rules = BitRules.from_tensor(rules)
+        else:
+            raise TypeError("Parameter rules must be int or tensor")
+
+        if tuple(tensor_rules.corner) != tuple(self.corner) or tensor_rules.dim != self.dim:
+            # realignment is rare (first step or moved rules), so it's done by the unpacked tensor
+            tensor_next = self.to_tensor().next_life(tensor_rules.to_tensor(), next_cell_func)
+            return BitTensor.from_tensor(tensor_next)
+
+        planes = self.__count_planes()
+        equals = {}  # packed masks of the counts, each one is computed only once
+
+        def equal(count):
+            if count not in equals:
+                equals[count] = self.__equal(planes, count)
+            return equals[count]
+
+        area_size = 3 ** self.ndim
+        neighbors = np.arange(area_size)
+        result = np.zeros_like(self.__packed)
+        for code, mask in tensor_rules.masks.items():
+            codes = np.full(area_size, code)
+            birth_table = next_cell_func(codes, np.zeros(area_size, dtype=int), neighbors, ndim=self.ndim) != 0
+            survive_table = next_cell_func(codes, np.ones(area_size, dtype=int), neighbors, ndim=self.ndim) != 0
+            birth = np.zeros_like(result)
+            survive = np.zeros_like(result)
+            for count in neighbors[birth_table]:
+                birth |= equal(count)
+            for count in neighbors[survive_table] + 1:  # count of the alive cell includes itself
+                survive |= equal(count)
+            result |= mask & ((~self.__packed & birth) | (self.__packed & survive))
+        return BitTensor(tuple(self.corner), self.dim, result)
+
+    # ----------------- Others ----------------- #
+
+    def __copy__(self):
+        """ implementation of copy process """
+        return BitTensor(tuple(self.__corner.copy()), self.dim, self.__packed.copy())
+
+    def __str__(self):
+        """ string representation of an object (the same as for LocatedTensor) """
+        return str(self.to_tensor())
+
+
+class BitRules:
+    """
+    the class implements rules tensor for the BitTensor: packed mask of the cells for each distinct not null code
+    """
+
+    def __init__(self, corner, dim, masks):
+        """
+        :param corner: (tuple) vector of the lower left corner of the tensor location in N dimensional space
+        :param dim: (tuple) shape of the unpacked tensor
+        :param masks: (dict) code -> mask of the cells with this code packed by np.packbits along the last axis
+        """
+        self.corner = np.array(corner)
+        self.dim = tuple(int(size) for size in dim)
+        self.masks = masks
+
+    @classmethod
+    def from_tensor(cls, tensor):
+        """ alternative creator from the LocatedTensor with codes """
+        codes = np.unique(tensor[:])
+        masks = {int(code): np.packbits(tensor[:] == code, axis=-1) for code in codes if code != 0}
+        return cls(tuple(tensor.corner), tensor.dim, masks)
+
+    @classmethod
+    def full(cls, corner, dim, code):
+        """ alternative creator of the rules with the same code for all cells (without unpacked tensor) """
+        if code == 0:
+            return cls(corner, dim, {})
+        mask = np.full(tuple(dim[:-1]) + ((dim[-1] + 7) // 8,), 0xFF, dtype=np.uint8)
+        if dim[-1] % 8:
+            mask[..., -1] = (0xFF << (8 - dim[-1] % 8)) & 0xFF  # bits after the last cell stay zero
+        return cls(corner, dim, {code: mask})
+
+    def to_tensor(self):
+        """ convert to the LocatedTensor with codes """
+        result = LocatedTensor.zeros(tuple(self.corner), dim=self.dim)
+        for code, mask in self.masks.items():
+            result[np.unpackbits(mask, axis=-1, count=self.dim[-1]).astype(bool)] = code
+        return result
@@ -0,0 +1,248 @@
+import numpy as np
+from tensor import LocatedTensor
+
+
+class ChunkedTensor:
+    """
+    the class implements an unbounded N dimensional tensor: the space is split into chunks of the same size,
+    chunks are kept in the hash map by chunk coordinate and only chunks with not null values are allocated
+    """
+
+    default_chunk_size = 16  # size of the chunk along each axis
+
+    # ----------------- Class creators ----------------- #
+
+    def __init__(self, ndim=3, chunk_size=None):
+        """
+        :param ndim: (int) number of dimensional
+        :param chunk_size: (int) size of the chunk along each axis
+        """
+        self.chunk_size = self.default_chunk_size if chunk_size is None else chunk_size
+        self.__ndim = ndim
+        self.__chunks = {}  # chunk coordinate (tuple) -> value of the chunk (ndarray)
+        self.__unique_values = None  # cache for unique_values
+
+    @classmethod
+    def from_tensor(cls, tensor, chunk_size=None):
+        """ alternative creator from the LocatedTensor """
+        result = cls(tensor.ndim, chunk_size)
+        first_key = result.chunk_key(tensor.corner)
+        last_key = result.chunk_key(tensor.opp_corner)
+        for key in np.ndindex(tuple(np.array(last_key) - first_key + 1)):
+            key = tuple(int(i) for i in np.array(key) + first_key)
+            chunk = tensor.realign(result.chunk_corner(key), result.chunk_dim)[:]
+            if chunk.any():
+                result.__chunks[key] = chunk
+        return result
+
+    @classmethod
+    def rules_from_tensor(cls, tensor):
+        """ rules are kept in the same form as values """
+        return cls.from_tensor(tensor)
+
+    def to_tensor(self):
+        """ convert to the LocatedTensor which covers all not null values """
+        corner, dim = self.__content_box()
+        dtype = next(iter(self.__chunks.values())).dtype if self.__chunks else int
+        result = LocatedTensor.zeros(tuple(corner), dim=tuple(dim), dtype=dtype)
+        for key, chunk in self.__chunks.items():  # each chunk has not null values, so it overlaps the box
+            chunk_tensor = LocatedTensor(self.chunk_corner(key), chunk, copy=False)
+            cross_corner = np.maximum(corner, chunk_tensor.corner)
+            cross_dim = np.minimum(result.opp_corner, chunk_tensor.opp_corner) - cross_corner + 1
+            cross = chunk_tensor[chunk_tensor.slice_global(cross_corner, cross_dim)]
+            result[result.slice_global(cross_corner, cross_dim)] = cross
+        return result
+
+    # ----------------- Values ----------------- #
+
+    def get_global(self, point, default=None):
+        """
+        access to tensor's value (getter) BY GLOBAL POINT
+        the tensor is unbounded, so there are no points out of range and default is kept only for compatibility
+        """
+        chunk = self.__chunks.get(self.chunk_key(point))
+        if chunk is None:
+            return 0
+        return chunk[self.__point_in_chunk(point)]
+
+    def set_global(self, point, value):
+        """ access to tensor's value (setter) BY GLOBAL POINT, the chunk is allocated or freed if it's necessary """
+        key = self.chunk_key(point)
+        chunk = self.__chunks.get(key)
+        if chunk is None:
+            if value == 0:
+                return
+            chunk = self.__chunks[key] = np.zeros(self.chunk_dim, dtype=int)
+        chunk[self.__point_in_chunk(point)] = value
+        if value == 0 and not chunk.any():
+            del self.__chunks[key]  # free empty chunk
+        self.__unique_values = None
+
+    # ----------------- Chunks ----------------- #
+
+    def chunk_key(self, point):
+        """ coordinate of the chunk which contains the global point """
+        return tuple(int(i) for i in np.floor_divide(np.array(point), self.chunk_size))
+
+    def chunk_corner(self, key):
+        """ global point of the lower left corner of the chunk """
+        return tuple(int(i) for i in np.array(key) * self.chunk_size)
+
+    def get_chunk(self, key):
+        """ value of the chunk or None if chunk isn't allocated """
+        return self.__chunks.get(key)
+
+    @property
+    def chunk_keys(self):
+        """ coordinates of all allocated chunks """
+        return list(self.__chunks.keys())
+
+    @property
+    def chunk_dim(self):
+        """ shape of each chunk """
+        return (self.chunk_size,) * self.ndim
+
+    def __point_in_chunk(self, point):
+        """ local point inside of the chunk """
+        return tuple(np.mod(np.array(point), self.chunk_size))
+
+    def __halo_block(self, key):
+        """
+        halo exchange: value of the chunk with one-cell margin taken from the neighbor chunks
+        returns LocatedTensor or None if the chunk and all its neighbors are empty
+        """
+        size = self.chunk_size
+        sources = {-1: slice(size - 1, size), 0: slice(0, size), 1: slice(0, 1)}  # what neighbor gives
+        targets = {-1: slice(0, 1), 0: slice(1, size + 1), 1: slice(size + 1, size + 2)}  # where it's placed
+        block = None
+        for offset in np.ndindex((3,) * self.ndim):
+            offset = tuple(i - 1 for i in offset)
+            chunk = self.__chunks.get(tuple(k + i for k, i in zip(key, offset)))
+            if chunk is None:
+                continue
+            if block is None:
+                block = np.zeros((size + 2,) * self.ndim, dtype=chunk.dtype)
+            block[tuple(targets[i] for i in offset)] = chunk[tuple(sources[i] for i in offset)]
+        if block is None:
+            return None
+        return LocatedTensor(tuple(i - 1 for i in self.chunk_corner(key)), block)
+
+    # ----------------- Points ----------------- #
+
+    @property
+    def not_null_points_global(self):
+        """ all points with not null values (GLOBAL POINTS) """
+        points = []
+        for key, chunk in self.__chunks.items():
+            corner = self.chunk_corner(key)
+            points += [tuple(np.array(point) + corner) for point in zip(*np.nonzero(chunk))]
+        return points
+
+    # ----------------- Attributes ----------------- #
+
+    @property
+    def ndim(self):
+        """ shortcut for the number of dimensional """
+        return self.__ndim
+
+    @property
+    def corner(self):
+        """ corner (left-bottom) of the box which covers all not null values """
+        return self.__content_box()[0]
+
+    @property
+    def dim(self):
+        """ shape of the box which covers all not null values """
+        return tuple(self.__content_box()[1])
+
+    @property
+    def opp_corner(self):
+        """ vector of the opposite corner (right-top) of the box which covers all not null values """
+        corner, dim = self.__content_box()
+        return corner + dim - 1
+
+    @property
+    def unique_values(self):
+        """ distinct not null values (it's computed once and kept until tensor is changed) """
+        if self.__unique_values is None:
+            values = [np.unique(chunk[chunk != 0]) for chunk in self.__chunks.values()]
+            self.__unique_values = np.unique(np.concatenate(values)) if values else np.zeros(0, dtype=int)
+        return self.__unique_values
+
+    def __content_box(self):
+        """ corner and dim of the box which covers all not null values """
+        if not self.__chunks:
+            return np.zeros(self.ndim, dtype=int), np.zeros(self.ndim, dtype=int)
+        lower, upper = [], []
+        for key, chunk in self.__chunks.items():
+            points = np.array(np.nonzero(chunk))
+            lower.append(points.min(axis=1) + self.chunk_corner(key))
+            upper.append(points.max(axis=1) + self.chunk_corner(key))
+        corner = np.min(lower, axis=0)
+        return corner, np.max(upper, axis=0) - corner + 1
+
+    # ----------------- Math Operations ----------------- #
+
+    def next_life(self, rules, next_cell_func):
+        """
+        apply cellular automata rules to tensor and return next tensor state,
+        it steps chunk by chunk and computes only allocated chunks and their neighbors
+        (and the rules chunks with rules which birth cell while no neighbors)
+        """
+
+        if isinstance(rules, int):
+            if next_cell_func(np.array([rules]), np.zeros(1, dtype=int), np.zeros(1, dtype=int), ndim=self.ndim)[0]:
+                raise ValueError("Rule births cells from nothing, so it can't be applied to the unbounded tensor")
+            tensor_rules = None
+        elif isinstance(rules, LocatedTensor):
+            tensor_rules = ChunkedTensor.from_tensor(rules, self.chunk_size)
+        elif isinstance(rules, ChunkedTensor):
+            tensor_rules = rules
+            if rules.chunk_size != self.chunk_size:
+                tensor_rules = ChunkedTensor.from_tensor(rules.to_tensor(), self.chunk_size)
+        else:
+            raise TypeError("Parameter rules must be int or tensor")
+
+        # only allocated chunks and their neighbors can get alive cells
+        keys = set()
+        for key in self.__chunks:
+            for offset in np.ndindex((3,) * self.ndim):
+                keys.add(tuple(k + i - 1 for k, i in zip(key, offset)))
+
+        # rules which birth cell while no neighbors have to be computed for all their chunks
+        flash_keys = set()
+        if tensor_rules is not None:
+            keys &= set(tensor_rules.chunk_keys)
+            codes = tensor_rules.unique_values
+            zeros = np.zeros(len(codes), dtype=int)
+            flash_codes = codes[next_cell_func(codes, zeros, zeros, ndim=self.ndim) != 0]
+            if len(flash_codes):
+                flash_keys = {key for key in tensor_rules.chunk_keys
+                              if np.isin(tensor_rules.get_chunk(key), flash_codes).any()}
+
+        result = ChunkedTensor(self.ndim, self.chunk_size)
+        for key in keys | flash_keys:
+            corner = self.chunk_corner(key)
+            if tensor_rules is None:
+                chunk_rules = LocatedTensor(corner, np.full(self.chunk_dim, rules))
+            else:
+                chunk_rules = LocatedTensor(corner, tensor_rules.get_chunk(key), copy=False)
+            block = self.__halo_block(key)
+            if block is None:
+                block = LocatedTensor.zeros(corner, dim=self.chunk_dim)
+            chunk = block.next_life(chunk_rules, next_cell_func)[:]
+            if chunk.any():  # empty chunks aren't kept
+                result.__chunks[key] = chunk
+        return result
+
+    # ----------------- Others ----------------- #
+
+    def __copy__(self):
+        """ implementation of copy process """
+        result = ChunkedTensor(self.ndim, self.chunk_size)
+        result.__chunks = {key: chunk.copy() for key, chunk in self.__chunks.items()}
+        return result
+
+    def __str__(self):
+        """ string representation of an object (the same as for LocatedTensor of the content box) """
+        return str(self.to_tensor())
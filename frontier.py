@@ -0,0 +1,207 @@
+import numpy as np
+from copy import copy
+from tensor import LocatedTensor
+
+
+class FrontierTensor:
+    """
+    the class implements the same pair of an N dimensional tensor and a location vector as LocatedTensor,
+    which is stepped incrementally: the neighbors count is kept between steps and the rules are computed only
+    on the frontier (cells which value or neighbors count was changed by the last step), other cells can't change
+    """
+
+    # ----------------- Class creators ----------------- #
+
+    def __init__(self, tensor):
+        """
+        :param tensor: (LocatedTensor) initial values
+        """
+        self.__corner = None  # corner of the padded values (one-cell margin around the tensor)
+        self.__values = None  # padded values, the margin is always zero
+        self.__neighbors = None  # padded count of the alive neighbors
+        self.__rules = None  # padded rules of the last step (the frontier is valid only for the same rules)
+        self.__rules_source = None  # rules of the last step as they were given (number or tensor)
+        self.__frontier = None  # flat indexes of the padded cells which can be changed by the next step
+        self.__offsets = None  # flat offsets of the neighbors
+        self.__reset(tensor)
+
+    @classmethod
+    def from_tensor(cls, tensor):
+        """ alternative creator from the LocatedTensor """
+        return cls(copy(tensor))
+
+    @classmethod
+    def rules_from_tensor(cls, tensor):
+        """ rules are kept as is, so the same rules are recognized by identity """
+        return tensor
+
+    def to_tensor(self):
+        """ convert to the LocatedTensor (it's a copy, so it stays valid after the next steps) """
+        return LocatedTensor(tuple(self.corner), self.__values[self.__inner])
+
+    def __view(self):
+        """ LocatedTensor which shares memory with the values (only for reading inside of the class) """
+        return LocatedTensor(tuple(self.corner), self.__values[self.__inner], copy=False)
+
+    def __reset(self, tensor, rules=None, rules_source=None):
+        """ set all values, count the neighbors again and put all cells to the frontier """
+        self.__corner = tensor.corner - 1
+        self.__values = np.pad(tensor[:], 1)
+        self.__neighbors = LocatedTensor(tuple(self.__corner), self.__values, copy=False).num_alive()[:]
+        self.__rules = None if rules is None else np.pad(rules, 1)
+        self.__rules_source = rules_source
+        self.__frontier = np.arange(self.__values.size)
+        strides = np.array(self.__values.strides) // self.__values.itemsize
+        offsets = np.array(list(np.ndindex((3,) * self.ndim))) - 1
+        self.__offsets = offsets[(offsets != 0).any(axis=1)] @ strides  # exclude origin point
+
+    # ----------------- Values ----------------- #
+
+    def get_global(self, point, default=None):
+        """
+        access to tensor's value (getter) BY GLOBAL POINT
+        return default if point is out of range (handling not exists exception)
+        """
+        return self.__view().get_global(point, default)
+
+    def set_global(self, point, value):
+        """
+        access to tensor's value (setter) BY GLOBAL POINT, the neighbors and the frontier are updated
+        return ERROR if point is out of range (no handling not exists exception)
+        """
+        local_point = np.array(self.point_to_local(point))
+        if not ((0 <= local_point) & (local_point < np.array(self.dim))).all():
+            raise IndexError("Point is out of range")
+        index = np.array([np.ravel_multi_index(local_point + 1, self.__values.shape)])
+        self.__change(index, np.array([value], dtype=self.dtype))
+        around = (index + self.__offsets[:, None]).ravel()  # neighbors are changed even if the cell stays alive
+        self.__frontier = np.union1d(self.__frontier, np.concatenate([index, around]))
+
+    def __change(self, index, next_values):
+        """
+        write the values of the cells (flat indexes of the padded values),
+        the neighbors are updated around the cells which are born or died, returns indexes of these neighbors
+        """
+        flat_values = self.__values.reshape(-1)
+        flat_neighbors = self.__neighbors.reshape(-1)
+        was_alive = flat_values[index] != 0
+        is_alive = next_values != 0
+        flat_values[index] = next_values
+        born = (index[is_alive & ~was_alive][:, None] + self.__offsets).ravel()
+        died = (index[was_alive & ~is_alive][:, None] + self.__offsets).ravel()
+        np.add.at(flat_neighbors, born, 1)
+        np.subtract.at(flat_neighbors, died, 1)
+        return np.concatenate([born, died])
+
+    # ----------------- Points ----------------- #
+
+    def point_to_local(self, point):
+        """ to get a local location of the global point """
+        return tuple(np.array(point) - self.corner)
+
+    def point_to_global(self, point):
+        """ to get a global location of the local point """
+        return tuple(np.array(point) + self.corner)
+
+    @property
+    def not_null_points_global(self):
+        """ all points with not null values (GLOBAL POINTS) """
+        return self.__view().not_null_points_global
+
+    # ----------------- Attributes ----------------- #
+
+    @property
+    def dim(self):
+        """ shortcut for the shape """
+        return tuple(size - 2 for size in self.__values.shape)
+
+    @property
+    def ndim(self):
+        """ shortcut for the number of dimensional """
+        return self.__values.ndim
+
+    @property
+    def dtype(self):
+        """ shortcut for the type of values """
+        return self.__values.dtype
+
+    @property
+    def corner(self):
+        """ shortcut for corner (left-bottom) param """
+        return self.__corner + 1
+
+    @property
+    def opp_corner(self):
+        """ vector of the opposite corner (right-top) of the tensor """
+        return self.corner + self.dim - 1
+
+    @property
+    def frontier_size(self):
+        """ number of the cells which are computed by the next step """
+        return len(self.__frontier)
+
+    @property
+    def __inner(self):
+        """ slices which cut off the margin """
+        return tuple([slice(1, -1)] * self.ndim)
+
+    # ----------------- Math Operations ----------------- #
+
+    def num_alive(self):
+        """ count the number of the alive neighbors (include diagonal neighbors!), it's kept between steps """
+        return LocatedTensor(tuple(self.corner), self.__neighbors[self.__inner])
+
+    def __same_rules(self, rules):
+        """ check if the rules are the same as the rules of the last step """
+        if self.__rules is None or isinstance(rules, int) or isinstance(self.__rules_source, int):
+            return self.__rules is not None and rules == self.__rules_source
+        if rules is self.__rules_source:
+            return True
+        same_location = tuple(rules.corner) == tuple(self.corner) and rules.dim == self.dim
+        return same_location and np.array_equal(rules[:], self.__rules[self.__inner])
+
+    def next_life(self, rules, next_cell_func):
+        """
+        apply cellular automata rules to tensor and return next tensor state (the tensor is stepped in place),
+        the first step and the step with the new rules are computed by the LocatedTensor,
+        then only the frontier is computed: cell can be changed only if its value or neighbors were changed
+        """
+
+        if not isinstance(rules, (int, LocatedTensor)):
+            raise TypeError("Parameter rules must be int or tensor")
+
+        if not self.__same_rules(rules):
+            tensor_next = self.__view().next_life(rules, next_cell_func)
+            if isinstance(rules, int):
+                self.__reset(tensor_next, np.full(tensor_next.dim, rules), rules)
+            else:
+                self.__reset(tensor_next, rules[:], rules)
+            return self
+
+        index = self.__frontier
+        flat_rules = self.__rules.reshape(-1)[index]
+        values = self.__values.reshape(-1)[index]
+        next_values = np.zeros_like(values)  # hardcode optimization! (skip zero rule)
+        mask = flat_rules != 0
+        neighbors = self.__neighbors.reshape(-1)[index[mask]]
+        next_values[mask] = next_cell_func(flat_rules[mask], values[mask], neighbors, ndim=self.ndim)
+
+        changed = next_values != values
+        index = index[changed]
+        counted = self.__change(index, next_values[changed])
+        self.__frontier = np.union1d(index, counted)  # these cells can be changed by the next step
+        return self
+
+    # ----------------- Others ----------------- #
+
+    def __copy__(self):
+        """ implementation of copy process """
+        result = FrontierTensor(self.__view())
+        result.__rules = self.__rules
+        result.__rules_source = self.__rules_source
+        result.__frontier = self.__frontier.copy()
+        return result
+
+    def __str__(self):
+        """ string representation of an object (the same as for LocatedTensor) """
+        return str(self.__view())
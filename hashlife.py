@@ -0,0 +1,392 @@
+import numpy as np
+from tensor import LocatedTensor
+
+
+DEAD, ALIVE, WALL = 0, 1, 2  # values of the cells inside of the tree (wall is a cell out of the rules region)
+
+
+class OctreeNode:
+    """
+    the class implements a node of the hash-consed tree: the node of the level k is a cube with side 2 ** k,
+    it has 2 ** ndim children of the level k - 1 (it's an octree for 3D), the leaves of the level 2 keep values,
+    nodes are created only by HashLifeEngine, so the same cubes are the same objects
+    """
+
+    __slots__ = ("level", "children", "value", "results")
+
+    def __init__(self, level, children=None, value=None):
+        """
+        :param level: (int) level of the node (side of the cube is 2 ** level)
+        :param children: (tuple) children nodes in C-order of their positions (for not leaf nodes)
+        :param value: (ndarray) values of the cells (for leaves)
+        """
+        self.level = level
+        self.children = children
+        self.value = value
+        self.results = {}  # memoized future: j -> center of the node after 2 ** j generations
+
+
+class HashLifeEngine:
+    """
+    the class implements HashLife algorithm for one binary rule: each node is kept only once (hash-consing)
+    and the future of each node is computed only once (memoization), so repetitive patterns cost almost nothing
+    """
+
+    leaf_level = 2  # leaves keep 4 ** ndim cells
+
+    def __init__(self, birth_table, survive_table, ndim=3, background=DEAD):
+        """
+        :param birth_table: (ndarray) birth condition of the dead cell indexed by the neighbors count
+        :param survive_table: (ndarray) survive condition of the alive cell indexed by the neighbors count
+        :param ndim: (int) number of dimensional
+        :param background: (int) value of the space around the tree (DEAD for unbounded space or WALL)
+        """
+        self.birth_table = np.asarray(birth_table, dtype=bool)
+        self.survive_table = np.asarray(survive_table, dtype=bool)
+        self.ndim = ndim
+        self.background = background
+        self.__positions = list(np.ndindex((2,) * ndim))  # positions of the children in C-order
+        self.__leaves = {}  # bytes of the value -> leaf
+        self.__nodes = {}  # children -> node
+        self.__empty = {}  # level -> node filled with background
+
+    # ----------------- Nodes ----------------- #
+
+    @property
+    def size(self):
+        """ number of the kept nodes and leaves """
+        return len(self.__nodes) + len(self.__leaves)
+
+    def same_rule(self, birth_table, survive_table, ndim, background):
+        """ check if the engine is created for the rule """
+        return (np.array_equal(self.birth_table, birth_table) and np.array_equal(self.survive_table, survive_table)
+                and (self.ndim, self.background) == (ndim, background))
+
+    def compact(self, root):
+        """
+        new engine with the same rule which keeps only the nodes of the root and returns the copy of the root,
+        the memoized future is forgotten (it's the way to free the memory of the long run)
+        """
+        engine = HashLifeEngine(self.birth_table, self.survive_table, self.ndim, self.background)
+        copies = {}  # id of the node -> its copy (the tree is a graph, so the same nodes are copied once)
+
+        def copy_node(node):
+            if id(node) not in copies:
+                if node.value is not None:
+                    copies[id(node)] = engine.leaf(node.value)
+                else:
+                    copies[id(node)] = engine.node(copy_node(child) for child in node.children)
+            return copies[id(node)]
+
+        return engine, copy_node(root)
+
+    def leaf(self, value):
+        """ canonical leaf with the given values """
+        value = np.array(value, dtype=np.uint8)  # copy, so the leaf doesn't keep the bigger array
+        key = value.tobytes()
+        if key not in self.__leaves:
+            value.flags.writeable = False
+            self.__leaves[key] = OctreeNode(self.leaf_level, value=value)
+        return self.__leaves[key]
+
+    def node(self, children):
+        """ canonical node with the given children """
+        children = tuple(children)
+        if children not in self.__nodes:
+            self.__nodes[children] = OctreeNode(children[0].level + 1, children=children)
+        return self.__nodes[children]
+
+    def empty(self, level):
+        """ node filled with background """
+        if level not in self.__empty:
+            if level == self.leaf_level:
+                self.__empty[level] = self.leaf(np.full((4,) * self.ndim, self.background))
+            else:
+                self.__empty[level] = self.node([self.empty(level - 1)] * 2 ** self.ndim)
+        return self.__empty[level]
+
+    def from_array(self, value):
+        """ node built from the cube with side 2 ** level (level >= 2) """
+        half = value.shape[0] // 2
+        if half == 2:
+            return self.leaf(value)
+        if (value == self.background).all():
+            return self.empty(value.shape[0].bit_length() - 1)
+        return self.node(self.from_array(value[self.__slices(p, half)]) for p in self.__positions)
+
+    def to_array(self, node):
+        """ cube of values of the node """
+        if node.value is not None:
+            return node.value
+        side = 2 ** node.level
+        if node is self.empty(node.level):
+            return np.full((side,) * self.ndim, self.background, dtype=np.uint8)
+        result = np.empty((side,) * self.ndim, dtype=np.uint8)
+        for p, child in zip(self.__positions, node.children):
+            result[self.__slices(p, side // 2)] = self.to_array(child)
+        return result
+
+    def leaves(self, node, offset=None):
+        """ not empty leaves of the node with their offsets (in cells) from the corner of the node """
+        offset = np.zeros(self.ndim, dtype=np.int64) if offset is None else offset
+        if node is self.empty(node.level):
+            return
+        if node.value is not None:
+            yield offset, node.value
+            return
+        half = 2 ** (node.level - 1)
+        for p, child in zip(self.__positions, node.children):
+            yield from self.leaves(child, offset + np.array(p) * half)
+
+    def __slices(self, position, size):
+        """ slices of the child at the position in the cube """
+        return tuple(slice(i * size, (i + 1) * size) for i in position)
+
+    def __index(self, position):
+        """ index of the child by its position """
+        return int(np.ravel_multi_index(position, (2,) * self.ndim))
+
+    def __grandchild(self, node, position):
+        """ grandchild by its position in the grid 4 ** ndim """
+        child = node.children[self.__index(tuple(i // 2 for i in position))]
+        return child.children[self.__index(tuple(i % 2 for i in position))]
+
+    def __compose(self, grid, origin):
+        """ node composed from the nodes of the grid (dict position -> node) which are started from the origin """
+        return self.node(grid[tuple(o + p for o, p in zip(origin, position))] for position in self.__positions)
+
+    # ----------------- Evolution ----------------- #
+
+    def __step_array(self, value):
+        """ one generation of the cube, the result is smaller by one cell on each side """
+        alive = (value == ALIVE).astype(np.uint8)
+        total = alive
+        for i in range(self.ndim):  # separable box sum: 3 shifted slices along each axis in turn
+            left = tuple([slice(None)] * i + [slice(0, -2)])
+            center = tuple([slice(None)] * i + [slice(1, -1)])
+            right = tuple([slice(None)] * i + [slice(2, None)])
+            total = total[left] + total[center] + total[right]
+        inner = tuple([slice(1, -1)] * self.ndim)
+        count = total - alive[inner]  # exclude origin point
+        next_value = np.where(alive[inner] != 0, self.survive_table[count], self.birth_table[count])
+        return np.where(value[inner] == WALL, WALL, next_value).astype(np.uint8)
+
+    def center(self, node):
+        """ node of the lower level in the center of the node """
+        if node.level == self.leaf_level + 1:
+            return self.leaf(self.to_array(node)[tuple([slice(2, 6)] * self.ndim)])
+        return self.node(self.__grandchild(node, tuple(1 + i for i in p)) for p in self.__positions)
+
+    def successor(self, node, j):
+        """ center of the node (level k >= 3) after 2 ** j generations (j <= k - 2) """
+        if j in node.results:
+            return node.results[j]
+        k = node.level
+        if k == self.leaf_level + 1:  # base case is computed by numpy
+            value = self.to_array(node)
+            for _ in range(2 ** j):
+                value = self.__step_array(value)
+            margin = 2 - 2 ** j
+            result = self.leaf(value[tuple([slice(margin, margin + 4)] * self.ndim)])
+        else:
+            # 3 ** ndim overlapped nodes of the level k - 1 are moved forward by half of the time (or not moved)
+            grandchildren = {q: self.__grandchild(node, q) for q in np.ndindex((4,) * self.ndim)}
+            halves = {}
+            for g in np.ndindex((3,) * self.ndim):
+                sub = self.__compose(grandchildren, g)
+                halves[g] = self.successor(sub, k - 3) if j == k - 2 else self.center(sub)
+            # 2 ** ndim nodes composed from them are moved forward by the rest of the time
+            result = self.node(self.successor(self.__compose(halves, p), min(j, k - 3)) for p in self.__positions)
+        node.results[j] = result
+        return result
+
+    def expand(self, node):
+        """ node of the next level with the given node in its center (it's surrounded by background) """
+        empty = self.empty(node.level - 1)
+        children = []
+        for p, child in zip(self.__positions, node.children):
+            opposite = self.__index(tuple(1 - i for i in p))
+            children.append(self.node(child if i == opposite else empty for i in range(2 ** self.ndim)))
+        return self.node(children)
+
+    def is_centered(self, node):
+        """ check if all not background cells are inside of the center of the node """
+        empty = self.empty(node.level - 2)
+        for q in np.ndindex((4,) * self.ndim):
+            if (0 in q or 3 in q) and self.__grandchild(node, q) is not empty:
+                return False
+        return True
+
+    def advance(self, node, corner, generations):
+        """ move the tree forward by the number of generations, returns new node and its corner """
+        j = 0
+        while generations > 0:
+            if generations & 1:
+                while node.level < max(j + 3, self.leaf_level + 2) or not self.is_centered(node):
+                    corner = corner - 2 ** (node.level - 1)
+                    node = self.expand(node)
+                corner = corner - 2 ** (node.level - 1)
+                node = self.expand(node)  # so the pattern can grow by 2 ** j cells and stay inside of the result
+                corner = corner + 2 ** (node.level - 2)
+                node = self.successor(node, j)
+            generations >>= 1
+            j += 1
+        return node, corner
+
+
+class HashLifeTensor:
+    """
+    the class implements binary (0 or 1) N dimensional tensor kept by the hash-consed tree (see HashLifeEngine),
+    rules must be the same code for all cells: a number for the unbounded space or a tensor with one not null code
+    (cells with zero rule are walls), it's the fastest way to jump thousands of generations ahead,
+    it only pays off for large jumps (generations or generations_per_tick) on sparse or repetitive unbounded
+    patterns, stepping one generation per frame is slower than LocatedTensor and the memory grows with each step,
+    the engine (nodes and memoized future) lives while the states made by it are used and it's compacted
+    when it keeps more than max_nodes nodes
+    """
+
+    binary = True  # it keeps only 0 and 1, so it can't be used with lifetime rules
+    max_nodes = 2 ** 20  # number of the nodes of the engine from which it's compacted (see HashLifeEngine.compact)
+
+    # ----------------- Class creators ----------------- #
+
+    def __init__(self, tensor, engine=None, root=None, corner=None, region=None, rules=None):
+        """
+        :param tensor: (LocatedTensor) values (only if the tree isn't given)
+        :param engine: (HashLifeEngine) engine of the tree
+        :param root: (OctreeNode) root of the tree
+        :param corner: (ndarray) global point of the corner of the root
+        :param region: (tuple) corner and dim of the rules region (None for the unbounded space)
+        :param rules: rules which the tree is built for
+        """
+        self.__tensor = tensor
+        self.__engine = engine
+        self.__root = root
+        self.__corner = corner
+        self.__region = region
+        self.__rules = rules
+
+    @classmethod
+    def from_tensor(cls, tensor):
+        """ alternative creator from the LocatedTensor (the tree is built by the first step) """
+        return cls(tensor)
+
+    @classmethod
+    def rules_from_tensor(cls, tensor):
+        """ rules are kept as is, so the same rules are recognized by identity """
+        return tensor
+
+    def to_tensor(self):
+        """ convert to the LocatedTensor: the rules region or the box which covers all alive cells """
+        if self.__root is None:
+            return self.__tensor
+        if self.__region is not None:
+            corner, dim = self.__region
+            return self.__window(corner, dim)
+        leaves = [(offset, value) for offset, value in self.__engine.leaves(self.__root) if (value == ALIVE).any()]
+        if not leaves:
+            return LocatedTensor.zeros(tuple(self.__corner), dim=(0,) * self.__engine.ndim, dtype=np.uint8)
+        lower = np.min([offset + np.argwhere(value == ALIVE).min(axis=0) for offset, value in leaves], axis=0)
+        upper = np.max([offset + np.argwhere(value == ALIVE).max(axis=0) for offset, value in leaves], axis=0)
+        return self.__window(self.__corner + lower, upper - lower + 1)
+
+    def __window(self, corner, dim):
+        """ alive cells of the tree in the given box as LocatedTensor """
+        result = LocatedTensor.zeros(tuple(corner), dim=tuple(dim), dtype=np.uint8)
+        for offset, value in self.__engine.leaves(self.__root):
+            start = self.__corner + offset - result.corner  # local point of the leaf in the result
+            lower = np.maximum(start, 0)
+            upper = np.minimum(start + value.shape, result.dim)
+            if (lower < upper).all():
+                target = tuple(slice(a, b) for a, b in zip(lower, upper))
+                source = tuple(slice(a, b) for a, b in zip(lower - start, upper - start))
+                result[target] = value[source] == ALIVE
+        return result
+
+    # ----------------- Attributes ----------------- #
+
+    @property
+    def ndim(self):
+        """ shortcut for the number of dimensional """
+        return self.to_tensor().ndim if self.__engine is None else self.__engine.ndim
+
+    @property
+    def root(self):
+        """ root of the tree (None before the first step) """
+        return self.__root
+
+    # ----------------- Math Operations ----------------- #
+
+    def __get_engine(self, code, next_cell_func, ndim, background):
+        """ engine for the rule (the engine of this tree is kept for the same rule), tables are from next_cell_func """
+        area_size = 3 ** ndim
+        neighbors = np.arange(area_size)
+        codes = np.full(area_size, code)
+        birth_table = next_cell_func(codes, np.zeros(area_size, dtype=int), neighbors, ndim=ndim) != 0
+        survive_table = next_cell_func(codes, np.ones(area_size, dtype=int), neighbors, ndim=ndim) != 0
+        if self.__engine is not None and self.__engine.same_rule(birth_table, survive_table, ndim, background):
+            return self.__engine
+        return HashLifeEngine(birth_table, survive_table, ndim, background)
+
+    def __same_rules(self, rules):
+        """ check if the tree is built for the rules """
+        if self.__root is None or isinstance(rules, int) or isinstance(self.__rules, int):
+            return self.__root is not None and rules == self.__rules
+        if rules is self.__rules:
+            return True
+        same_location = tuple(rules.corner) == tuple(self.__rules.corner) and rules.dim == self.__rules.dim
+        return same_location and np.array_equal(rules[:], self.__rules[:])
+
+    def __build(self, rules, next_cell_func):
+        """ build the tree for the rules: unbounded space for the number, region with walls for the tensor """
+        tensor = self.to_tensor()
+        if isinstance(rules, int):
+            zeros = np.zeros(1, dtype=int)
+            if next_cell_func(np.array([rules]), zeros, zeros, ndim=tensor.ndim)[0]:
+                raise ValueError("Rule births cells from nothing, so it can't be applied to the unbounded tensor")
+            engine = self.__get_engine(rules, next_cell_func, tensor.ndim, DEAD)
+            value = (tensor[:] != 0).astype(np.uint8)
+            region = None
+        else:
+            codes = np.unique(rules[:])
+            codes = codes[codes != 0]
+            if len(codes) > 1:
+                raise ValueError("HashLife needs the same rule code for all cells of the rules")
+            engine = self.__get_engine(int(codes[0]) if len(codes) else 0, next_cell_func, tensor.ndim, WALL)
+            tensor = tensor.next_life(rules, next_cell_func)  # cells out of the rules affect only the first step
+            value = np.where(rules[:] == 0, WALL, tensor[:] != 0).astype(np.uint8)
+            region = (tuple(rules.corner), rules.dim)
+        side = 2 ** max(engine.leaf_level + 1, int(np.ceil(np.log2(max(max(value.shape), 1)))))
+        cube = np.full((side,) * engine.ndim, engine.background, dtype=np.uint8)
+        cube[tuple(slice(0, size) for size in value.shape)] = value
+        return HashLifeTensor(None, engine, engine.from_array(cube), np.array(tensor.corner), region, rules)
+
+    def next_life(self, rules, next_cell_func, generations=1):
+        """
+        apply cellular automata rules to tensor and return tensor state after the number of generations,
+        the tree is built again only for the new rules (the first generation of the region is computed by
+        the LocatedTensor, so the alive cells out of the rules are counted as neighbors like in LocatedTensor)
+        """
+        if not isinstance(rules, (int, LocatedTensor)):
+            raise TypeError("Parameter rules must be int or tensor")
+
+        tensor = self
+        if not self.__same_rules(rules):
+            tensor = self.__build(rules, next_cell_func)
+            if not isinstance(rules, int):
+                generations -= 1  # the first generation is already computed
+        engine = tensor.__engine
+        root, corner = engine.advance(tensor.__root, tensor.__corner, generations)
+        if engine.size > self.max_nodes:
+            engine, root = engine.compact(root)
+        return HashLifeTensor(None, engine, root, corner, tensor.__region, rules)
+
+    def step_n(self, rules, next_cell_func, n):
+        """ tensor state after n generations (it's the same as next_life with the number of generations) """
+        return self.next_life(rules, next_cell_func, generations=n)
+
+    # ----------------- Others ----------------- #
+
+    def __str__(self):
+        """ string representation of an object (the same as for LocatedTensor) """
+        return str(self.to_tensor())
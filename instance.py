@@ -43,6 +43,12 @@ class Instance:
     def __get_cell_size(self, value):
         return 0 if value == 0 else self.grain * self.scale_factor * blu.normalize_factor(self.image)
 
+    @staticmethod
+    def __values(tensor):
+        """ not null values of the tensor by global points (points and values are taken as arrays at once) """
+        points, values = tensor.nonzero_global_array()
+        return dict(zip(map(tuple, points.tolist()), values.tolist()))
+
     def __bake_obj(self, obj, shift=0):
         obj.keyframe_insert("scale", frame=self.__current_frame + shift)
         obj.keyframe_insert("location", frame=self.__current_frame + shift)
@@ -68,8 +74,9 @@ class Instance:
         prev_tensor = self.__tensor
         self.__tensor = curr_tensor
 
-        prev_points = set(prev_tensor.not_null_points_global) if prev_tensor else set()
-        curr_points = set(curr_tensor.not_null_points_global)
+        prev_points = set(self.__values(prev_tensor)) if prev_tensor else set()
+        curr_values = self.__values(curr_tensor)
+        curr_points = set(curr_values)
         existed_points = set(self.all_objects.keys())
         reserve_points = (existed_points - curr_points) - prev_points
 
@@ -100,7 +107,7 @@ class Instance:
         for point in curr_points:
             if point in self.all_objects:
                 obj = self.all_objects[point]
-                value = curr_tensor.get_global(point)
+                value = curr_values[point]
                 if self.bake and self.frame_step > 1:
                     self.__bake_obj(obj, 1 - self.frame_step)
                 blu.scale_obj(obj, self.__get_cell_size(value))  # --> scale
@@ -125,10 +132,10 @@ class Instance:
 
     def info_limit(self, curr_tensor):
         """ crop set and show label """
-        curr_points = set(curr_tensor.not_null_points_global)
-        label_msg = str(len(curr_points)) + " (" + str(len(self.all_objects)) + ") " + " / " + str(self.limit)
+        points, _ = curr_tensor.nonzero_global_array()
+        label_msg = str(len(points)) + " (" + str(len(self.all_objects)) + ") " + " / " + str(self.limit)
         label_loc = [(curr_tensor.corner[i] + curr_tensor.dim[i] / 2) * self.grain for i in range(3)]  # center
         label_loc[2] += curr_tensor.dim[2] * self.grain  # move on the top
-        if len(curr_points) > self.limit:
+        if len(points) > self.limit:
             label_msg += " (LIMIT EXCEEDED!)"
         blu.show_label(self.label_tag, label_msg, loc=tuple(label_loc), collection=self.label_collection, hidden=False)
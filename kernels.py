@@ -0,0 +1,141 @@
+import os
+import numpy as np
+import threading
+from contextlib import contextmanager
+from functools import wraps
+try:
+    import numba
+except ImportError:
+    numba = None  # numba is optional, so the numpy path is used without it
+
+
+available = numba is not None
+enabled = available  # it can be turned off to compare the kernels with the numpy path
+prange = numba.prange if available else range
+lock = threading.Lock()  # kernels are parallel themselves, so they are called by one thread at a time
+local = threading.local()  # kernels can be turned off only for the current thread (see numpy_path)
+
+if available and not {"NUMBA_THREADING_LAYER", "NUMBA_THREADING_LAYER_PRIORITY"} & set(os.environ):
+    # tbb is the first by default, but the process which has started tbb threads hangs on exit after fork
+    # (SharedTensor forks its workers), the kernels are called under the lock, so the thread safe tbb isn't needed
+    numba.config.THREADING_LAYER_PRIORITY = ["omp", "workqueue", "tbb"]
+
+
+def is_enabled():
+    """ check if the kernels are used by the current thread """
+    return enabled and not getattr(local, "disabled", False)
+
+
+@contextmanager
+def numpy_path():
+    """
+    turn the kernels off for the current thread: threads which split the work themselves use the numpy path
+    (it releases GIL), otherwise they would wait for each other on the lock of the kernels
+    """
+    disabled = getattr(local, "disabled", False)
+    local.disabled = True
+    try:
+        yield
+    finally:
+        local.disabled = disabled
+
+
+def supports(ndim):
+    """ check if the kernels of the tensor are used for the number of dimensional """
+    return is_enabled() and ndim == 3
+
+
+def supports_rule(area_size):
+    """ check if the rule kernel is used for the number of the possible counts (code must fit into int64) """
+    return is_enabled() and 2 * area_size < 64
+
+
+def jit(parallel=False):
+    """ compile the function by numba (the function stays as is without numba, but it's never called then) """
+    if not available:
+        return lambda func: func
+
+    def decorator(func):
+        compiled = numba.njit(cache=True, parallel=parallel)(func)
+
+        @wraps(func)
+        def locked(*args):
+            with lock:  # the default threading layer of numba doesn't allow concurrent parallel kernels
+                return compiled(*args)
+        return locked
+    return decorator
+
+
+# ----------------- Kernels ----------------- #
+
+@jit(parallel=True)
+def num_alive_3d(value, out):
+    """
+    count the number of the alive neighbors of each cell (include diagonal neighbors!) into out,
+    it's separable box sum: 3 neighbor cells are added along each axis in turn
+    """
+    size_x, size_y, size_z = value.shape
+    along_z = np.zeros((size_x, size_y, size_z), dtype=np.uint8)
+    along_y = np.zeros((size_x, size_y, size_z), dtype=np.uint8)
+    for x in prange(size_x):
+        for y in range(size_y):
+            for z in range(size_z):
+                if value[x, y, z] != 0:
+                    along_z[x, y, z] += 1
+                    if z > 0:
+                        along_z[x, y, z - 1] += 1
+                    if z < size_z - 1:
+                        along_z[x, y, z + 1] += 1
+        for y in range(size_y):
+            for z in range(size_z):
+                along_y[x, y, z] = along_z[x, y, z]
+                if y > 0:
+                    along_y[x, y, z] += along_z[x, y - 1, z]
+                if y < size_y - 1:
+                    along_y[x, y, z] += along_z[x, y + 1, z]
+    for x in prange(size_x):
+        for y in range(size_y):
+            for z in range(size_z):
+                count = along_y[x, y, z]
+                if x > 0:
+                    count += along_y[x - 1, y, z]
+                if x < size_x - 1:
+                    count += along_y[x + 1, y, z]
+                if value[x, y, z] != 0:
+                    count -= 1  # exclude origin point
+                out[x, y, z] = count
+
+
+@jit(parallel=True)
+def enclosed_3d(value):
+    """ mask of the inner cells which are alive with all 6 face neighbors """
+    size_x, size_y, size_z = value.shape
+    result = np.zeros((max(size_x - 2, 0), max(size_y - 2, 0), max(size_z - 2, 0)), dtype=np.bool_)
+    for x in prange(1, size_x - 1):
+        for y in range(1, size_y - 1):
+            for z in range(1, size_z - 1):
+                result[x - 1, y - 1, z - 1] = (value[x, y, z] != 0 and
+                                               value[x - 1, y, z] != 0 and value[x + 1, y, z] != 0 and
+                                               value[x, y - 1, z] != 0 and value[x, y + 1, z] != 0 and
+                                               value[x, y, z - 1] != 0 and value[x, y, z + 1] != 0)
+    return result
+
+
+@jit(parallel=True)
+def apply_rule(codes, values, neighbors, area_size, lifetime, maximum, out):
+    """
+    apply the rules to flat arrays of cells, birth and survive conditions are taken from the bits of the code
+    (see CellRule.get_code: the highest bit is the birth with 0 neighbors, the next one is the survive with 0)
+    """
+    top = 2 * area_size - 1
+    for i in prange(codes.size):
+        value = values[i]
+        shift = top - 2 * neighbors[i] - (0 if value == 0 else 1)
+        if (codes[i] >> shift) & 1 == 0:
+            out[i] = 0
+        elif not lifetime:
+            out[i] = 1
+        elif value < maximum:
+            out[i] = value + 1
+        else:
+            out[i] = value  # lifetime is saturating
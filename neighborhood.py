@@ -0,0 +1,135 @@
+import numpy as np
+
+
+class Neighborhood:
+    """
+    the class implements the set of the neighbors of a cell as a kernel tensor centered on the cell
+    (weights of the neighbors, the origin point is always excluded), the neighbors are counted by one of 3 ways:
+    box sum for the full box (Moore neighborhood of any radius), shifted sums for small kernels
+    and FFT convolution for large ones
+    """
+
+    fft_threshold = 48  # number of not null cells of the kernel from which FFT convolution is used
+
+    # ----------------- Class creators ----------------- #
+
+    def __init__(self, kernel):
+        """
+        :param kernel: (ndarray) not negative integer weights of the neighbors, odd size along each axis
+        """
+        kernel = np.array(kernel, dtype=np.int64)
+        assert all(size % 2 == 1 for size in kernel.shape), "Init exception: kernel must have ODD size along each axis"
+        assert (kernel >= 0).all(), "Init exception: weights of kernel must be NOT NEGATIVE"
+        kernel[tuple(size // 2 for size in kernel.shape)] = 0  # exclude origin point
+        self.__kernel = kernel
+        self.__kernel.flags.writeable = False
+        self.__box = bool((np.delete(kernel.ravel(), kernel.size // 2) == 1).all())  # full box of ones
+
+    @classmethod
+    def moore(cls, radius=1, ndim=3):
+        """ all cells of the cube with the edge 2 * radius + 1 (radius 1 is the usual neighborhood) """
+        return cls(np.ones((2 * radius + 1,) * ndim, dtype=np.int64))
+
+    @classmethod
+    def von_neumann(cls, radius=1, ndim=3):
+        """ cells within the manhattan distance (radius 1 is the face neighbors) """
+        offsets = np.indices((2 * radius + 1,) * ndim) - radius
+        return cls(np.abs(offsets).sum(axis=0) <= radius)
+
+    # ----------------- Attributes ----------------- #
+
+    @property
+    def kernel(self):
+        """ weights of the neighbors (read only) """
+        return self.__kernel
+
+    @property
+    def ndim(self):
+        """ shortcut for the number of dimensional """
+        return self.__kernel.ndim
+
+    @property
+    def radius(self):
+        """ the greatest distance to the neighbor along the axes (margin which is needed around the cells) """
+        return max(size // 2 for size in self.__kernel.shape)
+
+    @property
+    def size(self):
+        """ the greatest count of the neighbors (all of them are alive) """
+        return int(self.__kernel.sum())
+
+    @property
+    def area_size(self):
+        """ number of the possible counts (from 0 to size), it's 3 ** ndim for the usual neighborhood """
+        return self.size + 1
+
+    @property
+    def count_dtype(self):
+        """ the smallest type for the count of the neighbors """
+        return np.min_scalar_type(self.size)
+
+    # ----------------- Counting ----------------- #
+
+    def count(self, value, out=None):
+        """
+        count the alive (not null) neighbors of each cell of the array (cells outside of the array are dead),
+        the way of counting is chosen by the kernel
+        """
+        assert value.ndim == self.ndim, "Count exception: DIM of value and DIM of kernel must be equal"
+        alive = value != 0
+        if self.__box:
+            total = self.__box_sum(alive)
+        elif np.count_nonzero(self.__kernel) < self.fft_threshold:
+            total = self.__shifted_sum(alive)
+        else:
+            total = self.__fft_sum(alive)
+        if out is None:
+            return total.astype(self.count_dtype)
+        np.copyto(out, total, casting="unsafe")
+        return out
+
+    def __box_sum(self, alive):
+        """ separable box sum by cumulative sums along each axis in turn, it doesn't depend on the radius """
+        total = alive.astype(self.count_dtype)
+        for i, size in enumerate(self.__kernel.shape):
+            radius = size // 2
+            padding = [(0, 0)] * self.ndim
+            padding[i] = (radius + 1, radius)  # leading zero, so the difference of cumulative sums is a window
+            cumulative = np.cumsum(np.pad(total, padding), axis=i, dtype=np.int64)
+            upper = tuple([slice(None)] * i + [slice(size, None)])
+            lower = tuple([slice(None)] * i + [slice(0, -size)])
+            total = cumulative[upper] - cumulative[lower]
+        return total - alive  # exclude origin point
+
+    def __shifted_sum(self, alive):
+        """ sum of the shifted arrays: one slice of the padded array for each neighbor """
+        radii = [size // 2 for size in self.__kernel.shape]
+        padded = np.pad(alive.astype(self.count_dtype), [(radius, radius) for radius in radii])
+        total = np.zeros(alive.shape, dtype=np.int64)
+        for offset in zip(*np.nonzero(self.__kernel)):
+            shifted = tuple(slice(start, start + size) for start, size in zip(offset, alive.shape))
+            total += self.__kernel[offset] * padded[shifted]
+        return total
+
+    def __fft_sum(self, alive):
+        """ FFT convolution of the alive cells with the flipped kernel (it's a correlation with the kernel) """
+        shape = tuple(size + kernel_size - 1 for size, kernel_size in zip(alive.shape, self.__kernel.shape))
+        flipped = self.__kernel[tuple([slice(None, None, -1)] * self.ndim)]
+        spectrum = np.fft.rfftn(alive, s=shape) * np.fft.rfftn(flipped, s=shape)
+        total = np.fft.irfftn(spectrum, s=shape)
+        same = tuple(slice(size // 2, size // 2 + length) for size, length in zip(self.__kernel.shape, alive.shape))
+        return np.rint(total[same]).astype(np.int64)
+
+    # ----------------- Others ----------------- #
+
+    def __eq__(self, other):
+        """ neighborhoods are equal if they have the same kernel """
+        return isinstance(other, Neighborhood) and np.array_equal(self.__kernel, other.__kernel)
+
+    def __hash__(self):
+        """ hash of the kernel """
+        return hash((self.__kernel.shape, self.__kernel.tobytes()))
+
+    def __str__(self):
+        """ string representation of an object """
+        return f"Neighborhood(ndim={self.ndim}, radius={self.radius}, size={self.size})"
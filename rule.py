@@ -1,4 +1,6 @@
 import random
+import numpy as np
+import kernels
 
 
 class CellRule:
@@ -6,17 +8,26 @@ class CellRule:
     Class for calculate cellular automata rules and apply them
     """
 
+    __tables = {}  # cache of decoded rules: (code, area size) -> (birth table, survive table)
+    __generations_tables = {}  # cache of Generations rules: (code, area size, states) -> table of the next states
+
+    @classmethod
+    def get_area_size(cls, ndim=3, neighborhood=None):
+        """ number of the possible counts of the neighbors: 3 ** ndim for the usual neighborhood (see Neighborhood) """
+        return 3 ** ndim if neighborhood is None else neighborhood.area_size
+
     @classmethod
-    def get_code(cls, birth_cond, survive_cond=None, ndim=3):
+    def get_code(cls, birth_cond, survive_cond=None, ndim=3, neighborhood=None):
 
         # ndim = 2 --> 2-dimensional space
+        # neighborhood = None --> 3 ** ndim - 1 neighbors (otherwise counts up to neighborhood.size are encoded)
         # birth_cond = [3] --> a dead cell turn to life if only has 3 neighbors
         # survive_cond = [2, 3] --> a living cell stays alife if only has 2 or 3 neighbors
 
         if survive_cond is None:
             survive_cond = birth_cond.copy()
 
-        area_size = 3 ** ndim  # 9 for 2d
+        area_size = cls.get_area_size(ndim, neighborhood)  # 9 for 2d
 
         # 1) create rules for dead cell and for living cell
 
@@ -42,11 +53,11 @@ class CellRule:
         return code
 
     @classmethod
-    def get_condition(cls, code, ndim=3):
+    def get_condition(cls, code, ndim=3, neighborhood=None):
 
         # code = 7168
 
-        area_size = 3 ** ndim
+        area_size = cls.get_area_size(ndim, neighborhood)
 
         # 1) convert to binary
 
@@ -66,42 +77,137 @@ class CellRule:
         return birth_cond, survive_cond
 
     @classmethod
-    def apply_rule_binary(cls, code, value, neighbors, ndim=3):
-        birth_cond, survive_cond = cls.get_condition(code, ndim=ndim)
-        if value == 0:
-            return int(neighbors in birth_cond)
-        else:
-            return int(neighbors in survive_cond)
+    def get_table(cls, code, ndim=3, neighborhood=None):
+        """
+        decode the code into birth and survive tables indexed by the neighbors count
+        (each code is decoded only once, then it's taken from the cache)
+        """
+        area_size = cls.get_area_size(ndim, neighborhood)
+        key = (int(code), area_size)
+        if key not in cls.__tables:
+            birth_cond, survive_cond = cls.get_condition(code, ndim=ndim, neighborhood=neighborhood)
+            birth_table = np.zeros(area_size, dtype=bool)
+            survive_table = np.zeros(area_size, dtype=bool)
+            birth_table[birth_cond] = True  # --> [False, False, False, True, False, False, False, False, False]
+            survive_table[survive_cond] = True  # --> [False, False, True, True, False, False, False, False, False]
+            cls.__tables[key] = (birth_table, survive_table)
+        return cls.__tables[key]
 
     @classmethod
-    def apply_rule_lifetime(cls, code, value, neighbors, ndim=3):
-        birth_cond, survive_cond = cls.get_condition(code, ndim=ndim)
-        if value == 0:
-            b = int(neighbors in birth_cond)
-            return b * value + b
+    def get_tables(cls, codes, ndim=3, neighborhood=None):
+        """
+        tables for the array of codes: each distinct code gets its own row in birth and survive tables,
+        returns index of the row for each code, so birth_table[index, neighbors] is the birth condition of the cell
+        """
+        area_size = cls.get_area_size(ndim, neighborhood)
+        unique_codes, index = np.unique(codes, return_inverse=True)
+        tables = [cls.get_table(code, ndim=ndim, neighborhood=neighborhood) for code in unique_codes]
+        birth_table = np.array([table[0] for table in tables]).reshape(len(tables), area_size)
+        survive_table = np.array([table[1] for table in tables]).reshape(len(tables), area_size)
+        return index.reshape(np.shape(codes)), birth_table, survive_table
+
+    @classmethod
+    def apply_rule_binary(cls, code, value, neighbors, ndim=3, neighborhood=None):
+        """ code, value and neighbors can be numbers or ndarrays with the same shape (one item per cell) """
+        result = cls.__apply_rule_kernel(code, value, neighbors, cls.get_area_size(ndim, neighborhood), lifetime=False)
+        if result is not None:
+            return result
+        index, birth_table, survive_table = cls.get_tables(code, ndim=ndim, neighborhood=neighborhood)
+        b = np.where(np.equal(value, 0), birth_table[index, neighbors], survive_table[index, neighbors])
+        return b.astype(np.uint8)[()]  # [()] turns 0-dim array to number
+
+    @classmethod
+    def apply_rule_lifetime(cls, code, value, neighbors, ndim=3, neighborhood=None):
+        """
+        code, value and neighbors can be numbers or ndarrays with the same shape (one item per cell),
+        lifetime is saturating: it stops at the maximum of the type of value (255 for uint8) instead of overflowing
+        """
+        result = cls.__apply_rule_kernel(code, value, neighbors, cls.get_area_size(ndim, neighborhood), lifetime=True)
+        if result is not None:
+            return result
+        index, birth_table, survive_table = cls.get_tables(code, ndim=ndim, neighborhood=neighborhood)
+        b = np.where(np.equal(value, 0), birth_table[index, neighbors], survive_table[index, neighbors])
+        value = np.asarray(value)
+        if np.issubdtype(value.dtype, np.integer):
+            step = value < np.iinfo(value.dtype).max  # value on the maximum isn't increased
         else:
-            b = int(neighbors in survive_cond)
-            return b * value + b
+            step = 1
+        return ((value + step) * b).astype(value.dtype, copy=False)[()]  # [()] turns 0-dim array to number
+
+    @classmethod
+    def get_generations_table(cls, code, states, ndim=3, neighborhood=None):
+        """
+        next state of the Generations rule indexed by [state, neighbors count] (uint8):
+        0 is dead, 1 is alive, states from 2 to states - 1 are dying (they don't count as alive neighbors),
+        dead cell is born by the birth condition, alive one stays alive by the survive condition or starts dying,
+        dying cell goes to the next state regardless of the neighbors, the last one becomes dead
+        """
+        if not 2 <= states <= 256:
+            raise ValueError("Number of states must be from 2 to 256 (states are kept as uint8)")
+        area_size = cls.get_area_size(ndim, neighborhood)
+        key = (int(code), area_size, states)
+        if key not in cls.__generations_tables:
+            birth_table, survive_table = cls.get_table(code, ndim=ndim, neighborhood=neighborhood)
+            table = np.zeros((states, area_size), dtype=np.uint8)
+            table[0] = birth_table  # --> [0, 0, 0, 1, 0, 0, 0, 0, 0]
+            table[1] = np.where(survive_table, 1, 2 % states)  # --> [2, 2, 1, 1, 2, 2, 2, 2, 2]
+            for state in range(2, states):
+                table[state] = (state + 1) % states  # --> [3, 3, 3, 3, 3, 3, 3, 3, 3]
+            cls.__generations_tables[key] = table
+        return cls.__generations_tables[key]
+
+    @classmethod
+    def apply_rule_generations(cls, code, value, neighbors, ndim=3, neighborhood=None, states=3):
+        """
+        code, value and neighbors can be numbers or ndarrays with the same shape (one item per cell),
+        the next state is taken from the table of the code (see get_generations_table), values greater than
+        the last state are taken as the last state, neighbors must count only alive cells (next_life(alive_state=1)),
+        use functools.partial(CellRule.apply_rule_generations, states=N) as next_cell_func
+        """
+        unique_codes, index = np.unique(code, return_inverse=True)
+        tables = np.array([cls.get_generations_table(unique_code, states, ndim=ndim, neighborhood=neighborhood)
+                           for unique_code in unique_codes]).reshape(len(unique_codes), states, -1)
+        state = np.minimum(value, states - 1)
+        return tables[index.reshape(np.shape(code)), state, neighbors][()]  # [()] turns 0-dim array to number
+
+    @classmethod
+    def __apply_rule_kernel(cls, code, value, neighbors, area_size, lifetime):
+        """
+        apply rule by the numba kernel (conditions are taken from the bits of the code without decoding),
+        returns None if the kernel can't be used: numba isn't installed, code doesn't fit into int64
+        or arguments aren't integer arrays
+        """
+        if not kernels.supports_rule(area_size) or np.ndim(code) == 0:
+            return None
+        code, value, neighbors = np.asarray(code), np.asarray(value), np.asarray(neighbors)
+        if not all(np.issubdtype(array.dtype, np.integer) for array in (code, value, neighbors)):
+            return None
+        dtype = value.dtype if lifetime else np.uint8
+        maximum = np.iinfo(value.dtype).max
+        out = np.empty(value.size, dtype=dtype)
+        kernels.apply_rule(code.astype(np.int64, copy=False).ravel(), value.ravel(), neighbors.ravel(),
+                           area_size, lifetime, value.dtype.type(maximum), out)
+        return out.reshape(value.shape)
 
     @classmethod
-    def get_max_code(cls, ndim=3):
-        return 2 ** (3 ** ndim * 2) - 1
+    def get_max_code(cls, ndim=3, neighborhood=None):
+        return 2 ** (cls.get_area_size(ndim, neighborhood) * 2) - 1
 
     @classmethod
-    def get_flash_point(cls, ndim=3):
+    def get_flash_point(cls, ndim=3, neighborhood=None):
         """
         all codes greater than or equal to the flash point result in uncontrolled growth
         (birth cell while no neighbors)
         """
-        return 2 ** (3 ** ndim * 2 - 1)
+        return 2 ** (cls.get_area_size(ndim, neighborhood) * 2 - 1)
 
     @classmethod
-    def get_percent(cls, code, ndim=3):
-        return round(code / cls.get_flash_point(ndim) * 100, 2)
+    def get_percent(cls, code, ndim=3, neighborhood=None):
+        return round(code / cls.get_flash_point(ndim, neighborhood) * 100, 2)
 
     @classmethod
-    def randrange(cls, percent_start, percent_stop, ndim=3):
-        code_start = int(percent_start / 100 * cls.get_flash_point(ndim))
-        code_stop = int(percent_stop / 100 * cls.get_flash_point(ndim))
-        code_stop = min(code_stop, cls.get_max_code(ndim))
+    def randrange(cls, percent_start, percent_stop, ndim=3, neighborhood=None):
+        code_start = int(percent_start / 100 * cls.get_flash_point(ndim, neighborhood))
+        code_stop = int(percent_stop / 100 * cls.get_flash_point(ndim, neighborhood))
+        code_stop = min(code_stop, cls.get_max_code(ndim, neighborhood))
         return random.randrange(code_start, code_stop)
@@ -0,0 +1,213 @@
+import os
+import sys
+import weakref
+import multiprocessing
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from tensor import LocatedTensor
+import kernels
+
+
+attached = {}  # blocks of shared memory attached by the worker process: name -> SharedMemory
+
+
+def attach(name):
+    """ shared memory block by name, it's attached once for each process """
+    if name not in attached:
+        try:
+            attached[name] = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:  # python < 3.13 has no track parameter
+            attached[name] = shared_memory.SharedMemory(name=name)
+    return attached[name]
+
+
+def init_worker():
+    """
+    the worker process computes its slab by the numpy path: threads of the parallel kernels don't survive fork
+    (the forked worker would hang in the kernel or on exit), and the processes already split the work
+    """
+    kernels.enabled = False
+
+
+def step_slab(task):
+    """
+    compute the slab of the rules in the worker process: values are read from the shared block of the current
+    generation (halo of the slab is written by the neighbor workers) and the slab is written into the next one
+    """
+    corner, dim, dtype, names, start, stop, next_cell_func = task
+    for name in [name for name in attached if name not in names]:
+        attached.pop(name).close()  # blocks of the old rules are already freed by the main process
+    current, following, rules = [attach(name).buf for name in names]
+    tensor_values = LocatedTensor.from_buffer(corner, current, dim=dim, dtype=dtype)
+    tensor_rules = LocatedTensor.from_buffer(corner, rules, dim=dim, dtype=np.int64)
+    tensor_next = LocatedTensor.from_buffer(corner, following, dim=dim, dtype=dtype)
+
+    margin_start, margin_stop = max(start - 1, 0), min(stop + 1, dim[0])  # one-cell halo
+    slab_corner = (corner[0] + start,) + tuple(corner[1:])
+    slab_values = LocatedTensor((corner[0] + margin_start,) + tuple(corner[1:]),
+                                tensor_values[margin_start:margin_stop], copy=False)
+    slab_rules = LocatedTensor(slab_corner, tensor_rules[start:stop], copy=False)
+    slab_next = LocatedTensor(slab_corner, tensor_next[start:stop], copy=False)
+    slab_values.next_life(slab_rules, next_cell_func, out=slab_next)
+
+
+class SharedTensor:
+    """
+    the class implements the same pair of an N dimensional tensor and a location vector as LocatedTensor,
+    which is stepped by the pool of processes: values and rules are kept in shared memory blocks,
+    each worker computes its own slab along the first axis, halos are read from the shared values directly,
+    so processes are synchronized only once per generation
+    """
+
+    workers = os.cpu_count()  # default number of the processes
+
+    # ----------------- Class creators ----------------- #
+
+    def __init__(self, tensor, workers=None):
+        """
+        :param tensor: (LocatedTensor) initial values
+        :param workers: (int) number of the processes
+        """
+        self.workers = self.workers if workers is None else workers
+        self.__tensor = tensor  # initial values (shared blocks are created by the first step)
+        self.__rules = None  # rules which the blocks are created for
+        self.__blocks = None  # shared blocks: current values, next values and rules
+        self.__executor = None
+        self.__finalizer = None
+
+    @classmethod
+    def from_tensor(cls, tensor, workers=None):
+        """ alternative creator from the LocatedTensor """
+        return cls(tensor, workers)
+
+    @classmethod
+    def rules_from_tensor(cls, tensor):
+        """ rules are kept as is, so the same rules are recognized by identity """
+        return tensor
+
+    def to_tensor(self):
+        """ convert to the LocatedTensor (it's a copy, so it stays valid after the next steps) """
+        return LocatedTensor(tuple(self.__tensor.corner), self.__tensor[:])
+
+    # ----------------- Attributes ----------------- #
+
+    @property
+    def corner(self):
+        """ shortcut for corner (left-bottom) param """
+        return self.__tensor.corner
+
+    @property
+    def dim(self):
+        """ shortcut for the shape """
+        return self.__tensor.dim
+
+    @property
+    def ndim(self):
+        """ shortcut for the number of dimensional """
+        return self.__tensor.ndim
+
+    @property
+    def dtype(self):
+        """ shortcut for the type of values """
+        return self.__tensor.dtype
+
+    # ----------------- Shared memory ----------------- #
+
+    def __share(self, tensor, tensor_rules):
+        """ create shared blocks for the values and the rules, the process pool is started once """
+        self.__free()
+        size = max(tensor[:].nbytes, 1)
+        self.__blocks = [shared_memory.SharedMemory(create=True, size=size) for _ in range(2)]
+        self.__blocks.append(shared_memory.SharedMemory(create=True, size=max(tensor_rules[:].size * 8, 1)))
+        values = LocatedTensor.from_buffer(tensor.corner, self.__blocks[0].buf, dim=tensor.dim, dtype=tensor.dtype)
+        values[:] = tensor[:]
+        rules = LocatedTensor.from_buffer(tensor.corner, self.__blocks[2].buf, dim=tensor.dim, dtype=np.int64)
+        rules[:] = tensor_rules[:]
+        self.__tensor = values
+        if self.__executor is None:
+            self.__executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=self.__context(),
+                                                  initializer=init_worker)
+        self.__finalizer = weakref.finalize(self, SharedTensor.__release, self.__blocks, self.__executor)
+
+    @staticmethod
+    def __context():
+        """
+        workers are forked where it's safe (linux), so scripts work as is (Blender scripts too),
+        other start methods import the main module in each worker, so the script needs if __name__ == "__main__"
+        """
+        if sys.platform.startswith("linux"):
+            return multiprocessing.get_context("fork")
+        if sys.modules["__main__"].__name__ == "__mp_main__":  # the script is imported again by the worker
+            raise RuntimeError("SharedTensor workers are started by spawn on this platform, "
+                               "so the code of the script must be under if __name__ == \"__main__\":")
+        return multiprocessing.get_context()
+
+    def __free(self):
+        """ free shared blocks (values are kept as local copy) """
+        if self.__finalizer is not None:
+            self.__tensor = self.to_tensor()
+            self.__finalizer.detach()
+            SharedTensor.__release(self.__blocks)
+            self.__blocks = None
+            self.__finalizer = None
+
+    @staticmethod
+    def __release(blocks, executor=None):
+        """ free shared blocks (and stop the process pool if it's given) """
+        for block in blocks:
+            block.close()
+            block.unlink()
+        if executor is not None:
+            executor.shutdown()
+
+    def close(self):
+        """ free shared blocks and stop the process pool (values are kept as local copy) """
+        self.__free()
+        if self.__executor is not None:
+            self.__executor.shutdown()
+            self.__executor = None
+
+    # ----------------- Math Operations ----------------- #
+
+    def __same_rules(self, rules):
+        """ check if the blocks are created for the rules """
+        if self.__blocks is None or isinstance(rules, int) or isinstance(self.__rules, int):
+            return self.__blocks is not None and rules == self.__rules
+        return rules is self.__rules
+
+    def next_life(self, rules, next_cell_func):
+        """ apply cellular automata rules to tensor and return next tensor state (the tensor is stepped in place) """
+        return self.step_n(rules, next_cell_func, 1)
+
+    def step_n(self, rules, next_cell_func, n):
+        """
+        tensor state after n generations (the tensor is stepped in place),
+        the first step with the new rules is computed by the LocatedTensor, then the slabs are given to the workers
+        """
+        if not isinstance(rules, (int, LocatedTensor)):
+            raise TypeError("Parameter rules must be int or tensor")
+
+        if not self.__same_rules(rules):
+            tensor_next = self.__tensor.next_life(rules, next_cell_func)
+            tensor_rules = np.full(tensor_next.dim, rules) if isinstance(rules, int) else rules[:]
+            self.__share(tensor_next, LocatedTensor(tuple(tensor_next.corner), tensor_rules, copy=False))
+            self.__rules = rules
+            n -= 1
+
+        corner, dim, dtype = tuple(self.corner), self.dim, self.dtype
+        bounds = np.linspace(0, dim[0], min(self.workers, dim[0]) + 1).astype(int) if dim[0] else []
+        for _ in range(n):
+            names = [block.name for block in self.__blocks]
+            tasks = [(corner, dim, dtype, names, int(start), int(stop), next_cell_func)
+                     for start, stop in zip(bounds[:-1], bounds[1:])]
+            list(self.__executor.map(step_slab, tasks))  # synchronization: all slabs of the generation are done
+            self.__blocks[0], self.__blocks[1] = self.__blocks[1], self.__blocks[0]
+            self.__tensor = LocatedTensor.from_buffer(corner, self.__blocks[0].buf, dim=dim, dtype=dtype)
+        return self
+
+    # ----------------- Others ----------------- #
+
+    def __str__(self):
+        """ string representation of an object (the same as for LocatedTensor) """
+        return str(self.to_tensor())
@@ -0,0 +1,367 @@
+import numpy as np
+from tensor import LocatedTensor
+
+
+class SparseTensor:
+    """
+    the class implements the same pair of an N dimensional tensor and a location vector as LocatedTensor,
+    but it keeps only not null values: sorted linear indexes of the points within the tensor and their values
+    """
+
+    # ----------------- Class creators ----------------- #
+
+    def __init__(self, corner, dim, index=None, values=None):
+        """
+        :param corner: (tuple) vector of the lower left corner of the tensor location in N dimensional space
+        :param dim: (tuple) shape of the tensor
+        :param index: (ndarray) sorted linear (C-order) indexes of the not null points within the tensor
+        :param values: (ndarray) values of the not null points
+        """
+        assert isinstance(corner, tuple), "Init exception: arg corner must be a TUPLE"
+        assert isinstance(dim, tuple), "Init exception: arg dim must be a TUPLE"
+        assert len(corner) == len(dim), "Init exception: LEN of corner and LEN of dim must be equal"
+        self.__corner = np.array(corner)
+        self.__dim = tuple(int(size) for size in dim)
+        self.__index = np.zeros(0, dtype=np.int64) if index is None else np.asarray(index, dtype=np.int64)
+        self.__values = np.zeros(0, dtype=int) if values is None else np.asarray(values)
+        assert len(self.__index) == len(self.__values), "Init exception: LEN of index and values must be equal"
+        self.__unique_values = None  # cache for unique_values
+
+    @classmethod
+    def zeros(cls, corner=None, *, dim):
+        """ alternative creator of empty tensor """
+        if corner is None:
+            corner = tuple(np.zeros(len(dim)).astype(int))  # set default value if it's necessary
+        return cls(corner, tuple(dim))
+
+    @classmethod
+    def from_tensor(cls, tensor):
+        """ alternative creator from the LocatedTensor """
+        flat = tensor[:].ravel()
+        index = np.flatnonzero(flat)
+        return cls(tuple(tensor.corner), tensor.dim, index, flat[index])
+
+    @classmethod
+    def rules_from_tensor(cls, tensor):
+        """ rules are kept in the same form as values """
+        return cls.from_tensor(tensor)
+
+    def to_tensor(self):
+        """ convert to the LocatedTensor """
+        result = LocatedTensor.zeros(tuple(self.corner), dim=self.dim, dtype=self.dtype)
+        result[np.unravel_index(self.__index, self.dim)] = self.__values
+        return result
+
+    # ----------------- Values ----------------- #
+
+    def get_global(self, point, default=None):
+        """
+        access to tensor's value (getter) BY GLOBAL POINT
+        return default if point is out of range (handling not exists exception)
+        """
+        local_point = np.array(self.point_to_local(point))
+        point_is_within = ((0 <= local_point) & (local_point < np.array(self.dim))).all()
+        if not point_is_within:
+            return default
+        key = np.ravel_multi_index(local_point, self.dim)
+        position = np.searchsorted(self.__index, key)
+        if position < len(self.__index) and self.__index[position] == key:
+            return self.__values[position]
+        return 0
+
+    def set_global(self, point, value):
+        """
+        access to tensor's value (setter) BY GLOBAL POINT
+        return ERROR if point is out of range (no handling not exists exception)
+        """
+        key = np.ravel_multi_index(self.point_to_local(point), self.dim)
+        position = np.searchsorted(self.__index, key)
+        exists = position < len(self.__index) and self.__index[position] == key
+        if exists and value == 0:
+            self.__index = np.delete(self.__index, position)
+            self.__values = np.delete(self.__values, position)
+        elif exists:
+            self.__values[position] = value
+        elif value != 0:
+            self.__index = np.insert(self.__index, position, key)
+            self.__values = np.insert(self.__values, position, value)
+        self.__unique_values = None
+
+    def __keys_within(self, points):
+        """ linear indexes of the (N, ndim) array of global points and the mask of the points within the tensor """
+        local_points = np.asarray(points, dtype=np.int64).reshape(-1, self.ndim) - self.corner
+        within = ((local_points >= 0) & (local_points < np.array(self.dim))).all(axis=1)
+        return np.ravel_multi_index(local_points[within].T, self.dim).astype(np.int64), within
+
+    def gather_global(self, points, default=0):
+        """
+        access to tensor's values (getter) BY ARRAY OF GLOBAL POINTS (N, ndim),
+        default is returned for points out of range (handling not exists exception)
+        """
+        keys, within = self.__keys_within(points)
+        result = np.full(len(within), default, dtype=LocatedTensor.result_dtype(self, default))
+        result[within] = SparseTensor.__lookup(self.__index, self.__values, keys)
+        return result
+
+    def scatter_global(self, points, values):
+        """
+        access to tensor's values (setter) BY ARRAY OF GLOBAL POINTS (N, ndim),
+        values is a number or an array of N values, points out of range are skipped (the last value of a point wins)
+        """
+        keys, within = self.__keys_within(points)
+        values = np.broadcast_to(values, (len(within),))[within]
+        keys, last = np.unique(keys[::-1], return_index=True)
+        values = values[::-1][last]
+        kept = ~np.isin(self.__index, keys)
+        index = np.concatenate([self.__index[kept], keys])
+        values = np.concatenate([self.__values[kept], values.astype(self.dtype)])
+        order = np.argsort(index, kind="stable")
+        not_null = values[order] != 0
+        self.__index, self.__values = index[order][not_null], values[order][not_null]
+        self.__unique_values = None
+
+    def nonzero_global_array(self):
+        """ all points with not null values as (N, ndim) array (GLOBAL POINTS) and array of their values """
+        return self.__coords() + self.corner, self.__values.copy()
+
+    # ----------------- Points ----------------- #
+
+    def point_to_local(self, point):
+        """ to get a local location of the global point """
+        return tuple(np.array(point) - self.corner)
+
+    def point_to_global(self, point):
+        """ to get a global location of the local point """
+        return tuple(np.array(point) + self.corner)
+
+    @property
+    def all_points_local(self):
+        """ returns list of all indexes of tensor (LOCAL POINTS) """
+        return list(np.ndindex(self.dim))
+
+    @property
+    def all_points_global(self):
+        """ returns list of all indexes of tensor (GLOBAL POINTS) """
+        return [self.point_to_global(point) for point in self.all_points_local]
+
+    @property
+    def not_null_points_local(self):
+        """ does the same that all_points, but it excludes zero values (LOCAL POINTS) """
+        return list(zip(*np.unravel_index(self.__index, self.dim)))
+
+    @property
+    def not_null_points_global(self):
+        """ does the same that all_points, but it excludes zero values (GLOBAL POINTS) """
+        return list(map(tuple, self.nonzero_global_array()[0].tolist()))
+
+    # ----------------- Attributes ----------------- #
+
+    @property
+    def dim(self):
+        """ shortcut for the shape """
+        return self.__dim
+
+    @property
+    def ndim(self):
+        """ shortcut for the number of dimensional """
+        return len(self.__dim)
+
+    @property
+    def corner(self):
+        """ shortcut for corner (left-bottom) param """
+        return self.__corner
+
+    @property
+    def opp_corner(self):
+        """ vector of the opposite corner (right-top) of the tensor """
+        return self.corner + self.dim - 1
+
+    @property
+    def dtype(self):
+        """ shortcut for the type of values """
+        return self.__values.dtype
+
+    @property
+    def index(self):
+        """ sorted linear indexes of the not null points """
+        return self.__index
+
+    @property
+    def values(self):
+        """ values of the not null points (in the same order as index) """
+        return self.__values
+
+    @property
+    def unique_values(self):
+        """ distinct not null values (it's computed once and kept until tensor is changed) """
+        if self.__unique_values is None:
+            self.__unique_values = np.unique(self.__values)
+        return self.__unique_values
+
+    # ----------------- Internal ----------------- #
+
+    def __coords(self):
+        """ local points of the not null values as (N, ndim) array """
+        return np.stack(np.unravel_index(self.__index, self.dim), axis=-1).reshape(-1, self.ndim)
+
+    def __index_in(self, corner, dim):
+        """
+        linear indexes of the not null points in the other location (points outside of it are dropped)
+        shifting keeps C-order, so the indexes stay sorted
+        """
+        coords = self.__coords() + (self.corner - np.array(corner))
+        within = ((coords >= 0) & (coords < np.array(dim))).all(axis=1)
+        return np.ravel_multi_index(coords[within].T, dim).astype(np.int64), self.__values[within]
+
+    def __count_neighbors(self, corner, dim):
+        """
+        count the alive neighbors for each point in the other location,
+        each alive point is shifted to the all neighbor positions and the shifted indexes are merged by np.unique
+        """
+        coords = self.__coords() + (self.corner - np.array(corner))
+        offsets = [offset for offset in np.ndindex((3,) * self.ndim) if offset != (1,) * self.ndim]
+        shifted_index = []
+        for offset in offsets:
+            shifted = coords + np.array(offset) - 1
+            within = ((shifted >= 0) & (shifted < np.array(dim))).all(axis=1)
+            shifted_index.append(np.ravel_multi_index(shifted[within].T, dim))
+        index, counts = np.unique(np.concatenate(shifted_index).astype(np.int64), return_counts=True)
+        return index, counts
+
+    @staticmethod
+    def __lookup(index, values, keys):
+        """ values for the sorted keys, zero for keys which aren't in the index """
+        result = np.zeros(len(keys), dtype=values.dtype)
+        if len(index) == 0:
+            return result
+        position = np.minimum(np.searchsorted(index, keys), len(index) - 1)
+        found = index[position] == keys
+        result[found] = values[position[found]]
+        return result
+
+    # ----------------- Math Operations ----------------- #
+
+    @classmethod
+    def __base_ops(cls, T1, T2, ops, signed=False):
+        """
+        base internal function that can use for create the binary operations, such as union and subtract.
+        ops must be a vectorized function, it's applied only to the merged not null points of both tensors
+        """
+        corner = tuple(np.vstack((T1.corner, T2.corner)).min(axis=0))
+        dim = tuple(np.vstack((T1.opp_corner, T2.opp_corner)).max(axis=0) - corner + 1)
+        index_1, values_1 = T1.__index_in(corner, dim)
+        index_2, values_2 = T2.__index_in(corner, dim)
+        index = np.union1d(index_1, index_2)
+        dtype = LocatedTensor.result_dtype(T1, T2, signed)
+        value_1 = np.zeros(len(index), dtype=dtype)
+        value_2 = np.zeros(len(index), dtype=dtype)
+        value_1[np.searchsorted(index, index_1)] = values_1
+        value_2[np.searchsorted(index, index_2)] = values_2
+        values = ops(value_1, value_2)
+        not_null = values != 0
+        return cls(corner, dim, index[not_null], values[not_null])
+
+    @classmethod
+    def __base_ops_broadcast(cls, t1, t2, ops, signed=False):
+        """
+        LocatedTensor operands are converted to sparse,
+        numbers change all points of the tensor, so such operations are done by dense tensor
+        """
+        t1 = cls.from_tensor(t1) if isinstance(t1, LocatedTensor) else t1
+        t2 = cls.from_tensor(t2) if isinstance(t2, LocatedTensor) else t2
+        if isinstance(t1, cls) and isinstance(t2, cls):  # both are SparseTensor
+            return cls.__base_ops(t1, t2, ops, signed)
+        if isinstance(t1, (int, float)) and isinstance(t2, cls):  # the left is a number
+            return cls.from_tensor(ops(t1, t2.to_tensor()))
+        if isinstance(t1, cls) and isinstance(t2, (int, float)):  # the right is a number
+            return cls.from_tensor(ops(t1.to_tensor(), t2))
+        if isinstance(t1, (int, float)) and isinstance(t2, (int, float)):  # both are numbers
+            return ops(t1, t2)
+
+    def __add__(self, other):
+        """ operation of addition two tensors (saturating, see LocatedTensor.add_saturated) """
+        return SparseTensor.__base_ops_broadcast(self, other, LocatedTensor.add_saturated)
+
+    def __sub__(self, other):
+        """ operation of subtraction two tensors """
+        return SparseTensor.__base_ops_broadcast(self, other, lambda a, b: a - b, signed=True)
+
+    def cross(self, other):
+        """ logical intersection (&) """
+        return SparseTensor.__base_ops_broadcast(self, other, lambda a, b: np.where((a != 0) & (b != 0), a, 0))
+
+    def union(self, other):
+        """ logical union (|) """
+        return SparseTensor.__base_ops_broadcast(self, other, lambda a, b: np.where(a != 0, a, b))
+
+    def diff(self, other):
+        """ logical difference (%)"""
+        return SparseTensor.__base_ops_broadcast(self, other, lambda a, b: np.where(b == 0, a, 0))
+
+    def __rshift__(self, other):
+        """ >> set other tensor as a background (change only zero values for the first tensor) """
+        return SparseTensor.__base_ops_broadcast(self, other, lambda a, b: np.where(a == 0, b, a))
+
+    def __lshift__(self, other):
+        """ << set the first tensor as a background (change only zero values for the first tensor) """
+        return SparseTensor.__base_ops_broadcast(self, other, lambda a, b: np.where(b == 0, a, b))
+
+    def num_alive(self):
+        """ count the number of the alive (non-zero) neighbors (include diagonal neighbors!) """
+        index, counts = self.__count_neighbors(tuple(self.corner), self.dim)
+        return SparseTensor(tuple(self.corner), self.dim, index, counts)
+
+    def next_life(self, rules, next_cell_func):
+        """
+        apply cellular automata rules to tensor and return next tensor state,
+        only alive points and their neighbors are computed (and all points of the rules which birth from nothing)
+        """
+
+        if isinstance(rules, int):
+            tensor_rules = None  # the same code for all points of the tensor, so it isn't expanded to the points
+            corner, dim = tuple(self.corner), self.dim
+            codes = np.array([rules])
+        elif isinstance(rules, SparseTensor):
+            tensor_rules = rules
+        elif isinstance(rules, LocatedTensor):
+            tensor_rules = SparseTensor.from_tensor(rules)
+        else:
+            raise TypeError("Parameter rules must be int or tensor")
+        if tensor_rules is not None:
+            corner, dim = tuple(tensor_rules.corner), tensor_rules.dim
+            codes = tensor_rules.unique_values
+
+        neighbors_index, neighbors = self.__count_neighbors(corner, dim)
+        values_index, values = self.__index_in(corner, dim)
+        candidates = [neighbors_index, values_index]
+
+        # rules which birth cell while no neighbors have to be computed for all their points
+        zeros = np.zeros(len(codes), dtype=int)
+        for code in codes[next_cell_func(codes, zeros, zeros, ndim=self.ndim) != 0]:
+            if tensor_rules is None:
+                candidates.append(np.arange(int(np.prod(dim)), dtype=np.int64))
+            else:
+                candidates.append(tensor_rules.index[tensor_rules.values == code])
+
+        index = np.unique(np.concatenate(candidates))
+        if tensor_rules is None:
+            cell_rule = np.full(len(index), rules)
+        else:
+            cell_rule = self.__lookup(tensor_rules.index, tensor_rules.values, index)
+        not_null_rule = cell_rule != 0  # hardcode optimization! (skip zero rule)
+        index, cell_rule = index[not_null_rule], cell_rule[not_null_rule]
+        cell_value = self.__lookup(values_index, values, index)
+        cell_neighbors = self.__lookup(neighbors_index, neighbors, index)
+        next_values = np.asarray(next_cell_func(cell_rule, cell_value, cell_neighbors, ndim=self.ndim))
+        not_null = next_values != 0
+        return SparseTensor(corner, dim, index[not_null], next_values[not_null])
+
+    # ----------------- Others ----------------- #
+
+    def __copy__(self):
+        """ implementation of copy process """
+        return SparseTensor(tuple(self.__corner.copy()), self.dim, self.__index.copy(), self.__values.copy())
+
+    def __str__(self):
+        """ string representation of an object (the same as for LocatedTensor) """
+        return str(self.to_tensor())
@@ -1,6 +1,16 @@
 import numpy as np
 import random
+import json
+import hashlib
+from itertools import combinations
 from copy import copy
+from concurrent.futures import ThreadPoolExecutor
+from rule import CellRule
+import kernels
+try:
+    import xxhash
+except ImportError:
+    xxhash = None  # xxhash is optional, blake2b is used without it
 
 
 class LocatedTensor:
@@ -10,35 +20,64 @@ class LocatedTensor:
 
     # ----------------- Class creators ----------------- #
 
-    def __init__(self, corner, value, axis_magic=False):
+    def __init__(self, corner, value, axis_magic=False, copy=True):
         """
         :param corner: (tuple) vector of the lower left corner of the tensor location in N dimensional space
         :param value: (ndarray) value of the tensor
         :param axis_magic: (boolean) changes axes in such way that str(tensor) looks like str(ndarray)
+        :param copy: (boolean) if False the tensor shares memory with the given value
         """
         assert isinstance(corner, tuple), "Init exception: arg corner must be a TUPLE"
         assert isinstance(value, np.ndarray), "Init exception: arg value must be an NDARRAY"
         assert len(corner) == value.ndim, "Init exception: LEN of corner and DIM of value must be equal"
         self.__corner = np.array(corner)
-        self.__value = np.flip(value.copy().T, axis=range(1, value.ndim)) if axis_magic else value.copy()
+        value = value.copy() if copy else value
+        self.__value = np.flip(value.T, axis=range(1, value.ndim)) if axis_magic else value
+        # counter of writes which is shared with the views of the tensor (None if writes can't be tracked:
+        # the given value is kept, so it can be written by the owner, e.g. other array, buffer or memmap)
+        self.__version = [0] if copy else None
+        self.__fingerprint = None  # cache of fingerprint: (version, fingerprint)
 
     @classmethod
-    def zeros(cls, corner=None, *, dim):
+    def zeros(cls, corner=None, *, dim, dtype=int):
         """ alternative creator, which fills tensor with zeros values """
         if corner is None:
             corner = tuple(np.zeros(len(dim)).astype(int))  # set default value if it's necessary
-        value = np.zeros(dim, dtype=int)
-        return cls(corner, value)
+        value = np.zeros(dim, dtype=dtype)
+        result = cls(corner, value, copy=False)
+        result.__version = [0]  # nobody else has the value, so the writes are tracked
+        return result
+
+    @classmethod
+    def from_buffer(cls, corner, buffer, *, dim, dtype=int):
+        """
+        alternative creator, which wraps existing buffer without copying (e.g. multiprocessing.shared_memory),
+        the tensor shares memory with the buffer, so the buffer must live while the tensor is used
+        """
+        value = np.ndarray(tuple(dim), dtype=dtype, buffer=buffer)
+        return cls(tuple(corner), value, copy=False)
 
     # ----------------- Values ----------------- #
 
     def __getitem__(self, key):
-        """ direct access to tensor's value (getter) BY LOCAL POINT """
-        return self.__value[key]
+        """
+        direct access to tensor's value (getter) BY LOCAL POINT,
+        the array which shares memory with the tensor can be written, so it's counted as a write
+        """
+        result = self.__value[key]
+        if isinstance(result, np.ndarray) and result.base is not None:
+            self.__touch()
+        return result
 
     def __setitem__(self, key, value):
         """ direct access to tensor's value (setter) BY LOCAL POINT """
         self.__value[key] = value
+        self.__touch()
+
+    def __touch(self):
+        """ count the write of the tensor, so the cached fingerprints of the tensor and its views are reset """
+        if self.__version is not None:
+            self.__version[0] += 1
 
     def get_global(self, point, default=None):
         """
@@ -61,6 +100,38 @@ class LocatedTensor:
         local_point = self.point_to_local(point)
         self[local_point] = value
 
+    def __points_within(self, points):
+        """ local points of the (N, ndim) array of global points and the mask of the points within the tensor """
+        local_points = np.asarray(points, dtype=np.int64).reshape(-1, self.ndim) - self.corner
+        within = ((local_points >= 0) & (local_points < np.array(self.dim))).all(axis=1)
+        return local_points, within
+
+    def gather_global(self, points, default=0):
+        """
+        access to tensor's values (getter) BY ARRAY OF GLOBAL POINTS (N, ndim),
+        default is returned for points out of range (handling not exists exception)
+        """
+        local_points, within = self.__points_within(points)
+        result = np.full(len(local_points), default, dtype=LocatedTensor.result_dtype(self, default))
+        result[within] = self.__value[tuple(local_points[within].T)]
+        return result
+
+    def scatter_global(self, points, values):
+        """
+        access to tensor's values (setter) BY ARRAY OF GLOBAL POINTS (N, ndim),
+        values is a number or an array of N values, points out of range are skipped
+        """
+        local_points, within = self.__points_within(points)
+        values = np.broadcast_to(values, (len(local_points),))
+        self.__value[tuple(local_points[within].T)] = values[within]
+        self.__touch()
+
+    def nonzero_global_array(self):
+        """ all points with not null values as (N, ndim) array (GLOBAL POINTS) and array of their values """
+        local_points = np.nonzero(self.__value)
+        points = np.stack(local_points, axis=-1).reshape(-1, self.ndim) + self.corner
+        return points, self.__value[local_points]
+
     # ----------------- Points ----------------- #
 
     def point_to_local(self, point):
@@ -73,6 +144,11 @@ class LocatedTensor:
         """
         return tuple(np.array(point) + self.corner)
 
+    def slice_global(self, corner, dim):
+        """ to get a local slices of the global region (corner and dim of the region must be within the tensor) """
+        start = np.array(corner) - self.corner
+        return tuple(slice(start[i], start[i] + dim[i]) for i in range(self.ndim))
+
     @property
     def all_points_local(self):
         """ returns list of all indexes of tensor (LOCAL POINTS) """
@@ -91,7 +167,60 @@ class LocatedTensor:
     @property
     def not_null_points_global(self):
         """ does the same that all_points, but it excludes zero values (GLOBAL POINTS) """
-        return [self.point_to_global(point) for point in self.not_null_points_local]
+        return list(map(tuple, self.nonzero_global_array()[0].tolist()))
+
+    # ----------------- Regions ----------------- #
+
+    def view(self, corner, dim):
+        """
+        tensor of the global region which shares memory with this tensor (changes are visible in both ways),
+        return ERROR if the region is not within the tensor
+        """
+        start = np.array(corner) - self.corner
+        stop = start + np.array(dim)
+        if len(start) != self.ndim or (start < 0).any() or (stop > np.array(self.dim)).any() or (start > stop).any():
+            raise IndexError("Region is out of range")
+        return self.__share(tuple(corner), self.__value[self.slice_global(corner, dim)])
+
+    def translate(self, offset):
+        """ the same values moved by the offset vector (only the corner is changed, memory is shared) """
+        return self.__share(tuple(self.corner + np.array(offset)), self.__value)
+
+    def __share(self, corner, value):
+        """ tensor of the value which shares memory with this tensor, the writes are counted by both of them """
+        result = LocatedTensor(corner, value, copy=False)
+        result.__version = self.__version
+        return result
+
+    def content_box(self):
+        """ corner and dim of the smallest region which contains all not null values (None, None if all are null) """
+        alive = self.__value != 0
+        start, stop = [], []
+        for i in range(self.ndim):
+            alive_along = np.flatnonzero(alive.any(axis=tuple(j for j in range(self.ndim) if j != i)))
+            if not alive_along.size:
+                return None, None
+            start.append(alive_along[0])
+            stop.append(alive_along[-1] + 1)
+        return self.corner + start, tuple(np.array(stop) - start)
+
+    def crop_to_content(self):
+        """ view of the smallest region which contains all not null values (empty view if all are null) """
+        corner, dim = self.content_box()
+        if corner is None:
+            return self.view(self.corner, (0,) * self.ndim)
+        return self.view(corner, dim)
+
+    def pad(self, margin):
+        """
+        tensor grown by the margin on each side (int or vector), new points are filled with zero,
+        view is returned if nothing is added (margin isn't positive), otherwise values are copied once
+        """
+        margin = np.broadcast_to(np.array(margin, dtype=int), (self.ndim,))
+        corner, dim = self.corner - margin, np.array(self.dim) + 2 * margin
+        if (margin <= 0).all():
+            return self.view(corner, np.maximum(dim, 0))
+        return self.realign(corner, np.maximum(dim, 0))
 
     # ----------------- Attributes ----------------- #
 
@@ -105,6 +234,11 @@ class LocatedTensor:
         """ shortcut for the number of dimensional """
         return self.__value.ndim
 
+    @property
+    def dtype(self):
+        """ shortcut for the type of values """
+        return self.__value.dtype
+
     @property
     def corner(self):
         """ shortcut for corner (left-bottom) param """
@@ -115,176 +249,462 @@ class LocatedTensor:
         """ vector of the opposite corner (right-top) of the tensor """
         return self.corner + self.dim - 1
 
+    # ----------------- Types ----------------- #
+
+    @staticmethod
+    def count_dtype(ndim, neighborhood=None):
+        """ the smallest type for the number of neighbors (uint8 for 3d) """
+        return np.min_scalar_type(3 ** ndim) if neighborhood is None else neighborhood.count_dtype
+
+    @staticmethod
+    def result_dtype(t1, t2, signed=False):
+        """
+        promotion rule for the binary operations: the smallest type which keeps values of both operands,
+        numbers take the smallest type which keeps them (so tensor of uint8 + 1 stays uint8),
+        signed is used for subtraction, so unsigned values don't wrap around zero,
+        addition keeps the type, but it's clamped instead of wrapping (see add_saturated)
+        """
+        dtypes = [t.dtype if hasattr(t, "dtype") else
+                  np.dtype(float) if isinstance(t, float) else np.min_scalar_type(t) for t in (t1, t2)]
+        dtype = np.promote_types(*dtypes)
+        if signed and dtype.kind == "u":
+            dtype = np.promote_types(dtype, np.int8)
+        return dtype
+
+    @staticmethod
+    def saturate(value, dtype):
+        """ cast values to the type, values out of the range of the type are clamped instead of overflowing """
+        if np.issubdtype(dtype, np.integer) and np.asarray(value).dtype != dtype:
+            info = np.iinfo(dtype)
+            value = np.clip(value, info.min, info.max)
+        return np.asarray(value).astype(dtype, copy=False)
+
+    @staticmethod
+    def add_saturated(a, b):
+        """
+        addition which is clamped to the range of the type instead of wrapping (uint8 200 + 100 is 255, not 44),
+        it's computed in the twice wider type, so 64-bit types still wrap as numpy does
+        """
+        dtype = np.result_type(a, b)
+        if dtype.kind not in "ui" or dtype.itemsize == 8:
+            return a + b
+        wide = np.dtype(f"{dtype.kind}{dtype.itemsize * 2}")
+        return LocatedTensor.saturate(np.add(a, b, dtype=wide), dtype)
+
     # ----------------- Math Operations ----------------- #
 
     @classmethod
-    def __base_ops(cls, T1, T2, ops):
+    def __cross_box(cls, T1, T2):
+        """ corner and dim of the intersection of two tensors, (None, None) if they aren't overlapped """
+        cross_corner = np.maximum(T1.corner, T2.corner)
+        cross_dim = np.minimum(T1.opp_corner, T2.opp_corner) - cross_corner + 1
+        if (cross_dim > 0).all():
+            return cross_corner, cross_dim
+        return None, None
+
+    @classmethod
+    def __output(cls, out, corner, dim, dtype=None):
+        """
+        check location (and type if it's given) of the given output tensor, or create new one if it isn't given,
+        the type of the output must keep all values of the result type, so they are never wrapped
+        """
+        if out is None:
+            return cls.zeros(tuple(corner), dim=tuple(dim), dtype=int if dtype is None else dtype)
+        if tuple(out.corner) != tuple(corner) or out.dim != tuple(dim):
+            raise ValueError("Output tensor must have the same corner and dim as the result")
+        if dtype is not None and not np.can_cast(dtype, out.dtype):
+            raise TypeError(f"Output tensor of type {out.dtype} can't keep the result of type {np.dtype(dtype)}")
+        out.__touch()  # output is going to be rewritten
+        return out
+
+    @classmethod
+    def __base_ops(cls, T1, T2, ops, out=None, signed=False):
         """
         base internal function that can use for create the binary operations, such as union and subtract.
+        ops must be a vectorized function (it takes ndarrays and returns ndarray)
+        out can be one of the operands, so all values are read before they are overwritten
         """
 
-        # create blank result tensor
+        # create blank result tensor (or take given one)
+        dtype = cls.result_dtype(T1, T2, signed)
         corner = tuple(np.vstack((T1.corner, T2.corner)).min(axis=0))
         dim = tuple(np.vstack((T1.opp_corner, T2.opp_corner)).max(axis=0) - corner + 1)
-        result = cls.zeros(corner, dim=dim)
-
-        # calculating values for result tensor:
-        for global_point in set(T1.all_points_global) | set(T2.all_points_global):  # or result.all_points_global ?
-            t1_value = T1.get_global(global_point, 0)
-            t2_value = T2.get_global(global_point, 0)
-            result.set_global(global_point, ops(t1_value, t2_value))
+        result = cls.__output(out, corner, dim, dtype)
+        t1_value = T1.__value.astype(dtype, copy=False)  # both operands are promoted before ops
+        t2_value = T2.__value.astype(dtype, copy=False)
+        cross_corner, cross_dim = cls.__cross_box(T1, T2)
+        if cross_corner is not None:  # T1 and T2 are overlapped
+            t1_cross = t1_value[T1.slice_global(cross_corner, cross_dim)]
+            t2_cross = t2_value[T2.slice_global(cross_corner, cross_dim)]
+            cross_value = ops(t1_cross, t2_cross)
+        if result is not T1 and result is not T2:
+            result[:] = 0  # the rest of the result stays zero
+
+        # calculating values for result tensor by whole slices:
+        result[result.slice_global(T1.corner, T1.dim)] = ops(t1_value, 0)  # T1 without T2
+        result[result.slice_global(T2.corner, T2.dim)] = ops(0, t2_value)  # T2 without T1
+        if cross_corner is not None:
+            result[result.slice_global(cross_corner, cross_dim)] = cross_value
 
         return result
 
     @classmethod
-    def __base_ops_broadcast(cls, t1, t2, ops):
+    def __base_ops_broadcast(cls, t1, t2, ops, out=None, signed=False):
         """
-        for operations like tensor + number we need to convert number to tensor,
+        for operations like tensor + number the number is broadcast by numpy over the tensor value,
         BUT operations like number + (tensor or number + number) work only with VirtualFuntion from virtual.py
         """
         if isinstance(t1, cls) and isinstance(t2, cls):  # both are LocatedTensor
-            return cls.__base_ops(t1, t2, ops)
+            return cls.__base_ops(t1, t2, ops, out=out, signed=signed)
         if isinstance(t1, (int, float)) and isinstance(t2, cls):  # the left is a number
-            t_broadcasted = copy(t2)
-            t_broadcasted[:] = t1
-            return cls.__base_ops(t_broadcasted, t2, ops)
+            dtype = cls.result_dtype(t1, t2, signed)
+            result = cls.__output(out, t2.corner, t2.dim, dtype)
+            result[:] = ops(t1, t2.__value.astype(dtype, copy=False))
+            return result
         if isinstance(t1, cls) and isinstance(t2, (int, float)):  # the right is a number
-            t_broadcasted = copy(t1)
-            t_broadcasted[:] = t2
-            return cls.__base_ops(t1, t_broadcasted, ops)
+            dtype = cls.result_dtype(t1, t2, signed)
+            result = cls.__output(out, t1.corner, t1.dim, dtype)
+            result[:] = ops(t1.__value.astype(dtype, copy=False), t2)
+            return result
         if isinstance(t1, (int, float)) and isinstance(t2, (int, float)):  # both are numbers
             return ops(t1, t2)
 
+    def __fits(self, other, signed=False):
+        """
+        check if other is a number or a tensor within this one and the type of the result is the same,
+        so the result can be kept in place
+        """
+        if LocatedTensor.result_dtype(self, other, signed) != self.dtype:
+            return False
+        if not isinstance(other, LocatedTensor):
+            return True
+        return (self.corner <= other.corner).all() and (other.opp_corner <= self.opp_corner).all()
+
     def __add__(self, other):
-        """ operation of addition two tensors """
-        return LocatedTensor.__base_ops_broadcast(self, other, lambda a, b: a + b)
+        """ operation of addition two tensors (saturating) """
+        return LocatedTensor.__base_ops_broadcast(self, other, LocatedTensor.add_saturated)
 
     def __sub__(self, other):
         """ operation of subtraction two tensors """
-        return LocatedTensor.__base_ops_broadcast(self, other, lambda a, b: a - b)
+        return LocatedTensor.__base_ops_broadcast(self, other, lambda a, b: a - b, signed=True)
+
+    def __iadd__(self, other):
+        """ += is done in place if other is within the tensor, otherwise new tensor is created """
+        out = self if self.__fits(other) else None
+        return LocatedTensor.__base_ops_broadcast(self, other, LocatedTensor.add_saturated, out=out)
 
-    def cross(self, other):
+    def __isub__(self, other):
+        """ -= is done in place if other is within the tensor, otherwise new tensor is created """
+        out = self if self.__fits(other, signed=True) else None
+        return LocatedTensor.__base_ops_broadcast(self, other, lambda a, b: a - b, out=out, signed=True)
+
+    def cross(self, other, out=None):
         """ logical intersection (&) """
-        return LocatedTensor.__base_ops(self, other, lambda a, b: (bool(a) & bool(b)) * a)
+        return LocatedTensor.__base_ops(self, other, lambda a, b: np.where((a != 0) & (b != 0), a, 0), out=out)
 
-    def union(self, other):
+    def union(self, other, out=None):
         """ logical union (|) """
-        return LocatedTensor.__base_ops(self, other, lambda a, b: (bool(a) | bool(b)) * (a or b))
+        return LocatedTensor.__base_ops(self, other, lambda a, b: np.where(a != 0, a, b), out=out)
 
-    def diff(self, other):
+    def diff(self, other, out=None):
         """ logical difference (%)"""
-        return LocatedTensor.__base_ops(self, other, lambda a, b: (bool(a) - bool(a * b)) * a)
+        return LocatedTensor.__base_ops(self, other, lambda a, b: np.where(b == 0, a, 0), out=out)
+
+    def cross_(self, other):
+        """ in place version of cross if other is within the tensor (and its type fits), otherwise new tensor """
+        return self.cross(other, out=self if self.__fits(other) else None)
+
+    def union_(self, other):
+        """ in place version of union if other is within the tensor (and its type fits), otherwise new tensor """
+        return self.union(other, out=self if self.__fits(other) else None)
+
+    def diff_(self, other):
+        """ in place version of diff if other is within the tensor (and its type fits), otherwise new tensor """
+        return self.diff(other, out=self if self.__fits(other) else None)
 
     def __rshift__(self, other):
         """ >> set other tensor as a background (change only zero values for the first tensor) """
-        return LocatedTensor.__base_ops(self, other, lambda a, b: b if a == 0 else a)
+        return LocatedTensor.__base_ops(self, other, lambda a, b: np.where(a == 0, b, a))
 
     def __lshift__(self, other):
         """ << set the first tensor as a background (change only zero values for the first tensor) """
-        return LocatedTensor.__base_ops(self, other, lambda a, b: a if b == 0 else b)
+        return LocatedTensor.__base_ops(self, other, lambda a, b: np.where(b == 0, a, b))
+
+    def __irshift__(self, other):
+        """ >>= is done in place if other is within the tensor, otherwise new tensor is created """
+        out = self if self.__fits(other) else None
+        return LocatedTensor.__base_ops(self, other, lambda a, b: np.where(a == 0, b, a), out=out)
+
+    def __ilshift__(self, other):
+        """ <<= is done in place if other is within the tensor, otherwise new tensor is created """
+        out = self if self.__fits(other) else None
+        return LocatedTensor.__base_ops(self, other, lambda a, b: np.where(b == 0, a, b), out=out)
+
+    def realign(self, corner, dim):
+        """ move tensor to the given location: values outside of it are cut off, new points are filled with zero """
+        result = self.zeros(tuple(corner), dim=tuple(dim), dtype=self.dtype)
+        cross_corner, cross_dim = LocatedTensor.__cross_box(self, result)
+        if cross_corner is not None:
+            result[result.slice_global(cross_corner, cross_dim)] = self[self.slice_global(cross_corner, cross_dim)]
+        return result
+
+    def __copy_to(self, out, number=0):
+        """
+        copy of the tensor written into the given output tensor (or new copy if it isn't given),
+        type of new copy is promoted if it's necessary to keep the number
+        """
+        if out is None:
+            dtype = LocatedTensor.result_dtype(self, number)
+            return LocatedTensor(tuple(self.corner), self.__value.astype(dtype))
+        result = LocatedTensor.__output(out, self.corner, self.dim, LocatedTensor.result_dtype(self, number))
+        if result is not self:
+            result[:] = self.__value
+        return result
 
-    def minimum(self, threshold):
+    def minimum(self, threshold, out=None):
         """ fill with threshold all values which don't satisfy the minimum  """
-        result = copy(self)
-        for point in result.not_null_points_local:
-            value = result[point]
-            if value < threshold:
-                result[point] = threshold
+        result = self.__copy_to(out, threshold)
+        result[(result[:] != 0) & (result[:] < threshold)] = threshold
         return result
 
-    def maximum(self, threshold):
+    def maximum(self, threshold, out=None):
         """ fill with threshold all values which don't satisfy the maximum  """
-        result = copy(self)
-        for point in result.not_null_points_local:
-            value = result[point]
-            if value > threshold:
-                result[point] = threshold
+        result = self.__copy_to(out, threshold)
+        result[(result[:] != 0) & (result[:] > threshold)] = threshold
         return result
 
-    def fill(self, value):
+    def fill(self, value, out=None):
         """ set all not null points with given value """
-        result = copy(self)
-        for point in result.not_null_points_local:
-            result[point] = value
+        result = self.__copy_to(out, value)
+        result[result[:] != 0] = value
         return result
 
-    def random_fill(self, values, weights=None):
-        """ set all not null points with random value """
-        result = copy(self)
-        for point in result.not_null_points_local:
-            result[point] = np.random.choice(values, p=weights)
+    def minimum_(self, threshold):
+        """ in place version of minimum """
+        return self.minimum(threshold, out=self)
+
+    def maximum_(self, threshold):
+        """ in place version of maximum """
+        return self.maximum(threshold, out=self)
+
+    def fill_(self, value):
+        """ in place version of fill """
+        return self.fill(value, out=self)
+
+    def random_fill(self, values, weights=None, seed=None, out=None):
+        """
+        set all not null points with random value
+        :param seed: (int or np.random.Generator) source of random values, fresh generator is used by default
+        """
+        result = self.__copy_to(out, max(values, key=abs))
+        mask = result[:] != 0
+        rng = np.random.default_rng(seed)
+        result[mask] = rng.choice(values, size=np.count_nonzero(mask), p=weights)  # all values by one call
         return result
 
-    def hollow(self):
+    def hollow(self, out=None):
         """
         [[1 1 1]    [[1 1 1]
          [1 1 1] =>  [1 0 1]
          [1 1 1]]    [1 1 1]]
         """
-        result = copy(self)
-        dim = self.dim
-        ndim = self.ndim
-        for point in result.all_points_local:
-            if self[point] != 0:  # count only for non-zero cell
-                cnt = 0
-                for i in range(ndim):  # step for each dimensional [0, 1, 2]
-                    offset = np.zeros(ndim)  # blank point [0, 0, 0]
-                    offset[i] = 1  # x-neighbor [1, 0, 0], y-neighbor [0, 1, 0], z-neighbor [0, 0, 1]
-                    for sign in [1, -1]:  # for opposite direction
-                        n = tuple(np.int64(np.array(point) + (offset * sign)))  # point for neighbor with shift
-                        if 0 <= n[i] < dim[i]:  # check boundaries
-                            cnt += 0 if self[n] == 0 else 1  # check neighbor
-                if cnt == len(point) * 2:  # max count of neighbors is ndim * 3 (4 for 2d, 6 for 3d)
-                    result[point] = 0  # set with zero if cell has max count of neighbors
+        inner = tuple([slice(1, -1)] * self.ndim)  # cells on the boundaries are never enclosed
+        if kernels.supports(self.ndim):
+            enclosed = kernels.enclosed_3d(self.__value)
+        else:
+            alive = self.__value != 0
+            enclosed = alive[inner].copy()
+            for i in range(self.ndim):  # step for each dimensional [0, 1, 2]
+                for shift in [slice(0, -2), slice(2, None)]:  # face neighbor for both directions
+                    neighbor = tuple([slice(1, -1)] * i + [shift] + [slice(1, -1)] * (self.ndim - i - 1))
+                    enclosed &= alive[neighbor]
+        result = self.__copy_to(out)
+        result[inner][enclosed] = 0  # set with zero if cell has max count of neighbors
         return result
 
-    def num_alive(self):
-        """ count the number of the alive (non-zero) neighbors (include diagonal neighbors!) """
-        def get_neighbors(point, start=True):  # let point = (1, 2, 3)
-            all_neighbors = []  # list for all possible neighbors
-            for i in [0, 1, -1]:  # all possible shifts, see for 1
-                if len(point) > 1:
-                    for tail in get_neighbors(point[1:], False):  # all possible tails, let see for (3, 3)
-                        neighbor = (point[0] + i, *tail)  # (1 + 1, (3, 3)) => (2, 3, 3)
-                        all_neighbors.append(neighbor)
-                else:
-                    neighbor = (point[0] + i,)  # for point (1,) we get 3 options of neighbors => (1,) (2,) (0,)
-                    all_neighbors.append(neighbor)
-            if start:
-                del all_neighbors[0]  # delete origin point that isn't neighbor for itself
-            return all_neighbors
-
-        result = self.zeros(tuple(self.corner), dim=self.dim)
-        for global_point in self.not_null_points_global:
-            for neighbor_point in get_neighbors(global_point):
-                cell_result = result.get_global(neighbor_point)
-                if cell_result is not None:
-                    result.set_global(neighbor_point, cell_result + 1)
+    def num_alive(self, out=None, neighborhood=None, alive_state=None):
+        """
+        count the number of the alive (non-zero) neighbors (include diagonal neighbors!),
+        :param neighborhood: (Neighborhood) other set of the neighbors (the usual one with radius 1 by default)
+        :param alive_state: (int) only neighbors with this value are alive (e.g. 1 for Generations rules)
+        """
+        result = LocatedTensor.__output(out, self.corner, self.dim, self.count_dtype(self.ndim, neighborhood))
+        value = self.__value if alive_state is None else self.__value == alive_state
+        if neighborhood is not None:
+            neighborhood.count(value, out=result.__value)
+            return result
+        if kernels.supports(self.ndim):
+            kernels.num_alive_3d(value, result.__value)
+            return result
+        alive = value != 0
+        count_dtype = self.count_dtype(self.ndim)  # the smallest type which keeps 3 ** ndim (uint8 up to 5d)
+        total = np.pad(alive.astype(count_dtype), 1)  # zero border, so the neighbors outside the tensor aren't counted
+        for i in range(self.ndim):  # separable box sum: 3 shifted slices along each axis in turn
+            left = tuple([slice(None)] * i + [slice(0, -2)])
+            center = tuple([slice(None)] * i + [slice(1, -1)])
+            right = tuple([slice(None)] * i + [slice(2, None)])
+            total = total[left] + total[center] + total[right]
+        np.subtract(total, alive, out=result.__value, casting="unsafe")  # exclude origin point
         return result
 
-    def next_life(self, rules, next_cell_func):
-        """ apply cellular automata rules to tensor and return next tensor state """
+    def __active_box(self, tensor_rules, neighborhood=None):
+        """
+        corner and dim of the part of the rules where cells can be alive at the next step:
+        box of the alive cells with margin of the neighborhood radius cut by the rules, or all the rules if there are
+        rules which birth cell while no neighbors (codes from the flash point), (None, None) if nothing can be alive
+        """
+        if (tensor_rules.__value >= CellRule.get_flash_point(self.ndim, neighborhood)).any():
+            return tensor_rules.corner, np.array(tensor_rules.dim)
+        content_corner, content_dim = self.content_box()
+        if content_corner is None:
+            return None, None
+        radius = 1 if neighborhood is None else neighborhood.radius
+        active_corner = np.maximum(content_corner - radius, tensor_rules.corner)
+        active_dim = np.minimum(content_corner + content_dim - 1 + radius, tensor_rules.opp_corner) - active_corner + 1
+        if (active_dim > 0).all():
+            return active_corner, active_dim
+        return None, None
+
+    def __next_box(self, tensor_rules, corner, dim, next_cell_func, neighbors, dtype, neighborhood, alive_state):
+        """
+        next values of the box of the rules (all values are only read, so boxes can be computed in parallel),
+        returns local slices of the box in the rules, mask of the not null rules in the box and their next values
+        """
+        box_slice = tensor_rules.slice_global(corner, dim)
+        box_rules = LocatedTensor(tuple(corner), tensor_rules.__value[box_slice], copy=False)  # rules are only read
+        if neighbors is not None:
+            neighbors = LocatedTensor(tuple(corner), neighbors[box_slice], copy=False)
+
+        if tuple(self.corner) == tuple(box_rules.corner) and self.dim == box_rules.dim:
+            # values are already aligned with the rules (it's usual case), nothing is around the rules
+            tensor_values = self
+            tensor_neighbors = self.num_alive(out=neighbors, neighborhood=neighborhood, alive_state=alive_state)
+        else:
+            # realign values to the rules location with margin, so the neighbors around the rules are counted too
+            radius = 1 if neighborhood is None else neighborhood.radius
+            margin_corner = tuple(box_rules.corner - radius)
+            margin_dim = tuple(np.array(box_rules.dim) + 2 * radius)
+            tensor_margin = self.realign(margin_corner, margin_dim)
+            inner = tuple([slice(radius, -radius or None)] * self.ndim)  # cut off the margin
+            tensor_values = LocatedTensor(tuple(box_rules.corner), tensor_margin[inner], copy=False)
+            count_dtype = self.count_dtype(self.ndim, neighborhood)
+            tensor_neighbors = LocatedTensor.__output(neighbors, box_rules.corner, box_rules.dim, count_dtype)
+            tensor_neighbors[:] = tensor_margin.num_alive(neighborhood=neighborhood, alive_state=alive_state)[inner]
+
+        mask = box_rules[:] != 0  # hardcode optimization! (skip zero rule)
+        cell_rule = box_rules[mask]
+        cell_value = self.saturate(tensor_values[mask], dtype)
+        cell_neighbors = tensor_neighbors[mask]
+        if neighborhood is None:  # next_cell_func gets the neighborhood only if it's given (see CellRule)
+            return box_slice, mask, next_cell_func(cell_rule, cell_value, cell_neighbors, ndim=self.ndim)
+        return box_slice, mask, next_cell_func(cell_rule, cell_value, cell_neighbors, ndim=self.ndim,
+                                               neighborhood=neighborhood)
+
+    @staticmethod
+    def __slabs(corner, dim, count):
+        """ split the box into slabs along the first axis (they are contiguous in memory) """
+        bounds = np.linspace(0, dim[0], min(count, dim[0]) + 1).astype(int)
+        return [((corner[0] + start,) + tuple(corner[1:]), (stop - start,) + tuple(dim[1:]))
+                for start, stop in zip(bounds[:-1], bounds[1:])]
+
+    def next_life(self, rules, next_cell_func, out=None, neighbors=None, dtype=None, workers=1, neighborhood=None,
+                  alive_state=None):
+        """
+        apply cellular automata rules to tensor and return next tensor state,
+        next_cell_func is vectorized: it takes arrays of rules, values and neighbors (one item per cell),
+        only the box of the alive cells with margin of the neighborhood radius is computed (see __active_box)
+        :param out: (LocatedTensor) buffer with the location of the rules to write the next state into
+        :param neighbors: (LocatedTensor) buffer with the location of the rules to count the neighbors into
+        :param dtype: type of the next state (type of out or type of the tensor by default),
+        values are saturated by this type, so next_cell_func can clamp them (see CellRule.apply_rule_lifetime)
+        :param workers: (int) number of threads, the box is split into slabs with one-cell halo for each thread,
+        the slabs are computed by the numpy path (it releases GIL for big arrays, so they are computed in parallel),
+        the kernels are parallel themselves, so they are used only with one worker
+        :param neighborhood: (Neighborhood) other set of the neighbors (e.g. radius 5 for Larger than Life),
+        it's passed to next_cell_func too, so the rules are decoded for its count range
+        :param alive_state: (int) only neighbors with this value are counted (see CellRule.apply_rule_generations),
+        all not null values are alive by default
+        """
 
         if isinstance(rules, int):
-            tensor_rules = copy(self)
-            tensor_rules[:] = rules
+            tensor_rules = LocatedTensor(tuple(self.corner), np.full(self.dim, rules), copy=False)
         elif isinstance(rules, LocatedTensor):
             tensor_rules = rules
         else:
             raise TypeError("Parameter rules must be int or tensor")
 
-        tensor_next = LocatedTensor.zeros(tuple(tensor_rules.corner), dim=tensor_rules.dim)
-        tensor_neighbors = self.num_alive()
-
-        for global_point in tensor_rules.not_null_points_global:  # hardcode optimization! (skip zero rule)
-            cell_rule = tensor_rules.get_global(global_point)
-            cell_value = self.get_global(global_point, 0)
-            neighbors = tensor_neighbors.get_global(global_point)
-            next_cell_value = next_cell_func(cell_rule, cell_value, neighbors, ndim=self.ndim)
-            tensor_next.set_global(global_point, next_cell_value)
+        if out is not None:
+            dtype = out.dtype
+        elif dtype is None:
+            dtype = self.dtype
+        tensor_next = LocatedTensor.__output(out, tensor_rules.corner, tensor_rules.dim, dtype)
+        if neighbors is not None:
+            LocatedTensor.__output(neighbors, tensor_rules.corner, tensor_rules.dim)  # check location
+
+        active_corner, active_dim = self.__active_box(tensor_rules, neighborhood)
+        if active_corner is None:  # there are no alive cells, so nothing can be born
+            tensor_next[:] = 0
+            return tensor_next
+
+        # out which shares memory with the values (e.g. self) is written after all slabs are read,
+        # otherwise each slab writes its own part of out as soon as it's computed
+        in_place = np.may_share_memory(tensor_next.__value, self.__value)
+        if not in_place:
+            tensor_next.__value[...] = 0
+
+        def next_box(box):
+            box_slice, mask, next_value = self.__next_box(tensor_rules, box[0], box[1], next_cell_func, neighbors,
+                                                          dtype, neighborhood, alive_state)
+            if in_place:
+                return box_slice, mask, next_value
+            tensor_next.__value[box_slice][mask] = next_value  # slabs are disjoint, so they are written in parallel
+
+        def next_slab(box):
+            with kernels.numpy_path():  # the kernels are parallel themselves, so they are called by one thread
+                return next_box(box)
+
+        slabs = self.__slabs(active_corner, active_dim, workers)
+        if len(slabs) == 1:
+            results = [next_box(slabs[0])]
+        else:
+            with ThreadPoolExecutor(max_workers=len(slabs)) as executor:
+                results = list(executor.map(next_slab, slabs))
 
+        if in_place:
+            tensor_next.__value[...] = 0  # all values are already read
+            for box_slice, mask, next_value in results:
+                tensor_next.__value[box_slice][mask] = next_value
         return tensor_next
 
+    def step_n(self, rules, next_cell_func, n, out=None, neighbors=None, dtype=None, spare=None, workers=1,
+               neighborhood=None, alive_state=None):
+        """
+        apply next_life n times in a loop: generations are written into out and spare in turn,
+        so only the final state is kept and no tensors are created between generations
+        :param spare: (LocatedTensor) buffer with the location of the rules for the intermediate generations
+        (the same parameters as next_life otherwise)
+        """
+        if n < 1:
+            raise ValueError("Number of generations must be positive")
+        if isinstance(rules, int):
+            rules = LocatedTensor(tuple(self.corner), np.full(self.dim, rules), copy=False)  # it's created once
+        if out is not None:
+            dtype = out.dtype
+        elif dtype is None:
+            dtype = self.dtype
+        out = LocatedTensor.__output(out, rules.corner, rules.dim, dtype)
+        if n > 1:
+            spare = LocatedTensor.__output(spare, rules.corner, rules.dim, dtype)
+        if neighbors is None:
+            count_dtype = self.count_dtype(self.ndim, neighborhood)
+            neighbors = LocatedTensor.zeros(tuple(rules.corner), dim=rules.dim, dtype=count_dtype)
+        buffers = (out, spare)
+        tensor = self
+        for i in range(n):
+            tensor = tensor.next_life(rules, next_cell_func, out=buffers[(n - 1 - i) % 2], neighbors=neighbors,
+                                      workers=workers, neighborhood=neighborhood, alive_state=alive_state)
+        return tensor
+
     def mirror(self):
         """ allow to get symmetry tensor"""
         result = copy(self)
@@ -297,11 +717,176 @@ class LocatedTensor:
             result[left] = np.flip(result[right], axis=i)
         return result
 
+    # ----------------- Morphology ----------------- #
+
+    @staticmethod
+    def __window(value, axis, reduce):
+        """ reduce each cell with 2 neighbor cells along the axis (cells outside of the tensor are zero) """
+        result = value.copy()
+        if not value.shape[axis]:
+            return result
+        head = tuple([slice(None)] * axis + [slice(1, None)])
+        tail = tuple([slice(None)] * axis + [slice(0, -1)])
+        reduce(result[head], value[tail], out=result[head])
+        reduce(result[tail], value[head], out=result[tail])
+        for edge in (0, -1):
+            edge = tuple([slice(None)] * axis + [edge])
+            result[edge] = reduce(result[edge], 0)
+        return result
+
+    @staticmethod
+    def __morphology(value, radius, connectivity, reduce):
+        """
+        reduce each cell with its neighbors within the radius (max for dilation, min for erosion),
+        the unit step is a union of separable boxes: each box covers 3 cells along several axes (1 axis for
+        6-connectivity, 2 axes for 18 and all axes for 26), so the cost grows linearly with the radius,
+        the result never shares memory with the value (it's a copy for radius 0)
+        """
+        if connectivity not in (6, 18, 26):
+            raise ValueError("Connectivity must be 6, 18 or 26")
+        if radius < 0:
+            raise ValueError("Radius must not be negative")
+        axes_count = min({6: 1, 18: 2, 26: 3}[connectivity], value.ndim)  # 4 and 8 neighbors in 2d
+        for _ in range(radius):
+            result = None
+            for axes in combinations(range(value.ndim), axes_count):
+                part = value
+                for axis in axes:
+                    part = LocatedTensor.__window(part, axis, reduce)
+                result = part if result is None else reduce(result, part)
+            value = result
+        return value if radius else value.copy()
+
+    def dilate(self, radius=1, connectivity=26):
+        """
+        each cell takes the max value of its neighbors within the radius (6, 18 or 26 neighbors for the unit step),
+        the tensor grows by the radius on each side, so nothing is cut off
+        """
+        grown = self.pad(radius)
+        value = LocatedTensor.__morphology(grown[:], radius, connectivity, np.maximum)
+        return LocatedTensor(tuple(grown.corner), value, copy=False)
+
+    def erode(self, radius=1, connectivity=26):
+        """
+        each cell takes the min value of its neighbors within the radius (6, 18 or 26 neighbors for the unit step),
+        cells outside of the tensor are zero, so the cells near the boundaries are eroded
+        """
+        value = LocatedTensor.__morphology(self.__value, radius, connectivity, np.minimum)
+        return LocatedTensor(tuple(self.corner), value, copy=False)
+
+    def opening(self, radius=1, connectivity=26):
+        """ erosion followed by dilation: small parts and thin bridges are removed (location is kept) """
+        return self.erode(radius, connectivity).dilate(radius, connectivity).view(self.corner, self.dim)
+
+    def closing(self, radius=1, connectivity=26):
+        """ dilation followed by erosion: small holes and gaps are filled (location is kept) """
+        return self.dilate(radius, connectivity).erode(radius, connectivity).view(self.corner, self.dim)
+
+    def shell(self, thickness=1, connectivity=6):
+        """
+        cells which are closer than the thickness to the empty cells (or the boundaries),
+        shell(1) with 6-connectivity is the same as hollow
+        """
+        result = copy(self)
+        result[self.erode(thickness, connectivity)[:] != 0] = 0
+        return result
+
+    # ----------------- Fingerprint ----------------- #
+
+    @staticmethod
+    def fingerprint_of(value, *info):
+        """
+        fast non-cryptographic hash of the raw buffer of the array (xxhash if it's installed, blake2b otherwise),
+        shape and type of the array are hashed with the given info, so arrays with the same bytes differ,
+        arrays of objects (e.g. codes of big neighborhoods which don't fit into int64) are hashed by their repr
+        """
+        hash_object = xxhash.xxh3_128() if xxhash is not None else hashlib.blake2b(digest_size=16)
+        hash_object.update(str((value.shape, str(value.dtype)) + info).encode())
+        if value.dtype.kind == "O":  # buffer keeps only references, so the values themselves are hashed
+            hash_object.update(repr(value.tolist()).encode())
+        else:
+            hash_object.update(np.ascontiguousarray(value).view(np.uint8))
+        return hash_object.hexdigest()
+
+    def fingerprint(self):
+        """
+        hash of the location and values, it's cached until the tensor or one of its views is written
+        (taking the array by tensor[...] is counted as a write), the tensors created with copy=False
+        (e.g. from buffers or memmap) are hashed each time, because their writes can't be tracked
+        """
+        if self.__version is None:
+            return LocatedTensor.fingerprint_of(self.__value, tuple(self.corner.tolist()))
+        if self.__fingerprint is None or self.__fingerprint[0] != self.__version[0]:
+            fingerprint = LocatedTensor.fingerprint_of(self.__value, tuple(self.corner.tolist()))
+            self.__fingerprint = (self.__version[0], fingerprint)
+        return self.__fingerprint[1]
+
+    # ----------------- Storage ----------------- #
+
+    file_magic = b"LTENSOR1"  # the first bytes of the file of the tensor
+    file_alignment = 64  # values are started from the offset which is a multiple of it
+
+    def save(self, path):
+        """
+        write the tensor into the file which can be opened by np.memmap, format of the file:
+        - 8 bytes: magic b"LTENSOR1"
+        - 4 bytes: length of the header (unsigned little-endian int)
+        - header: ASCII JSON {"corner": [...], "dim": [...], "dtype": "<u2"} padded with spaces,
+          so the values are started from the offset which is a multiple of 64
+        - values: raw bytes in C-order
+        """
+        with open(path, "wb") as file:
+            file.write(self.__header(self.corner, self.dim, self.dtype))
+            np.ascontiguousarray(self.__value).tofile(file)
+
+    @classmethod
+    def open(cls, path, mode="r", *, corner=None, dim=None, dtype=int):
+        """
+        alternative creator, which maps the file of the tensor (see save) into memory without reading it,
+        so tensors larger than RAM can be used, values are read and written by the operating system on demand
+        :param mode: (str) mode of np.memmap: "r" - read only, "r+" - read and write, "c" - copy on write,
+        "w+" - create new file (corner, dim and dtype must be given)
+        """
+        if mode == "w+":
+            assert dim is not None, "Open exception: arg dim must be given to create new file"
+            if corner is None:
+                corner = tuple(np.zeros(len(dim)).astype(int))  # set default value if it's necessary
+            header = cls.__header(corner, dim, dtype)
+            with open(path, "wb") as file:
+                file.write(header)
+                file.truncate(len(header) + int(np.prod(dim)) * np.dtype(dtype).itemsize)  # zero values
+            offset = len(header)
+            mode = "r+"  # np.memmap with "w+" would overwrite the header
+        else:
+            with open(path, "rb") as file:
+                if file.read(len(cls.file_magic)) != cls.file_magic:
+                    raise ValueError("File isn't a tensor file")
+                length = int.from_bytes(file.read(4), "little")
+                info = json.loads(file.read(length).decode("ascii"))
+            corner, dim, dtype = info["corner"], info["dim"], info["dtype"]
+            offset = len(cls.file_magic) + 4 + length
+        value = np.memmap(path, dtype=np.dtype(dtype), mode=mode, offset=offset, shape=tuple(dim))
+        return cls(tuple(corner), value, copy=False)
+
+    def flush(self):
+        """ write changes of the opened file to disk (nothing is done for the tensor in memory) """
+        if isinstance(self.__value, np.memmap):
+            self.__value.flush()
+
+    @classmethod
+    def __header(cls, corner, dim, dtype):
+        """ magic, length of the header and the header padded to the alignment """
+        info = {"corner": [int(i) for i in corner], "dim": [int(i) for i in dim], "dtype": np.dtype(dtype).str}
+        header = json.dumps(info).encode("ascii")
+        prefix = len(cls.file_magic) + 4
+        header += b" " * (-(prefix + len(header)) % cls.file_alignment)
+        return cls.file_magic + len(header).to_bytes(4, "little") + header
+
     # ----------------- Others ----------------- #
 
     def __copy__(self):
         """ implementation of copy process """
-        return LocatedTensor(tuple(self.__corner.copy()), self.__value.copy())
+        return LocatedTensor(tuple(self.__corner.copy()), self.__value)
 
     def __str__(self):
         """
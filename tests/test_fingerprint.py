@@ -0,0 +1,63 @@
+import numpy as np
+from tensor import LocatedTensor
+from neighborhood import Neighborhood
+from rule import CellRule
+from virtual import VirtualConstant
+
+
+def test_fingerprint_changes_with_values_and_location():
+    tensor = LocatedTensor((0, 0, 0), np.zeros((5, 5, 5), dtype=np.uint16))
+    before = tensor.fingerprint()
+    tensor[1, 2, 3] = 1
+    assert tensor.fingerprint() != before
+    assert tensor.translate((1, 0, 0)).fingerprint() != tensor.fingerprint()
+    assert LocatedTensor((0, 0, 0), tensor[:].astype(np.uint8)).fingerprint() != tensor.fingerprint()
+
+
+def test_fingerprint_of_object_codes():
+    neighborhood = Neighborhood.moore(5, ndim=2)
+    code = CellRule.get_code(list(range(34, 46)), list(range(33, 58)), ndim=2, neighborhood=neighborhood)
+    rules = LocatedTensor((0, 0), np.full((6, 6), code, dtype=object))
+    assert rules.dtype.kind == "O"
+    before = VirtualConstant(rules).hash()
+    assert before == VirtualConstant(LocatedTensor((0, 0), rules[:])).hash()
+    rules[2, 2] = code - 1
+    assert VirtualConstant(rules).hash() != before
+
+
+def test_constant_hash_of_big_array():
+    value = np.zeros(10 ** 5)
+    before = VirtualConstant(value).hash()
+    value[value.size // 2] = 1  # str of the array is abbreviated, so the change is in the hidden part
+    assert VirtualConstant(value).hash() != before
+
+
+def test_fingerprint_sees_writes_through_views_and_arrays():
+    tensor = LocatedTensor((0, 0), np.zeros((4, 4), dtype=np.uint8))
+    before = tensor.fingerprint()
+    tensor.view((1, 1), (2, 2))[0, 0] = 9
+    assert tensor.fingerprint() != before
+    before = tensor.fingerprint()
+    view = tensor.crop_to_content()
+    view_before = view.fingerprint()
+    tensor[1, 1] = 5
+    assert tensor.fingerprint() != before and view.fingerprint() != view_before
+    before = tensor.fingerprint()
+    tensor[:][2, 2] = 7
+    assert tensor.fingerprint() != before
+
+
+def test_fingerprint_of_shared_array():
+    value = np.zeros((4, 4), dtype=np.uint8)
+    tensor = LocatedTensor((0, 0), value, copy=False)
+    before = tensor.fingerprint()
+    value[0, 0] = 1
+    assert tensor.fingerprint() != before
+
+
+def test_constant_rules_keep_fingerprint_while_stepping():
+    rules = LocatedTensor((0, 0, 0), np.full((6, 6, 6), CellRule.get_code([4], [4, 5])))
+    values = LocatedTensor((0, 0, 0), np.random.default_rng(0).choice([0, 1], size=(6, 6, 6)).astype(np.uint16))
+    before = rules.fingerprint()
+    values.next_life(rules, CellRule.apply_rule_lifetime)
+    assert rules.fingerprint() == before
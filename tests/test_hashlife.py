@@ -0,0 +1,34 @@
+import numpy as np
+from tensor import LocatedTensor
+from hashlife import HashLifeTensor
+from rule import CellRule
+
+LIFE = CellRule.get_code([3], [2, 3], ndim=2)
+
+
+def glider():
+    return LocatedTensor((0, 0), np.array([[0, 1, 0], [0, 0, 1], [1, 1, 1]], dtype=np.uint8))
+
+
+def test_glider_jump():
+    result = HashLifeTensor.from_tensor(glider()).next_life(LIFE, CellRule.apply_rule_binary, generations=64)
+    expected = glider().translate((16, 16))  # glider moves by one cell along both axes each 4 generations
+    assert result.to_tensor().not_null_points_global == expected.not_null_points_global
+
+
+def test_engine_lives_with_its_states():
+    first = HashLifeTensor.from_tensor(glider()).next_life(LIFE, CellRule.apply_rule_binary, generations=8)
+    second = HashLifeTensor.from_tensor(glider()).next_life(LIFE, CellRule.apply_rule_binary, generations=8)
+    assert first.root is not second.root  # engines aren't shared between independent tensors
+    assert first.next_life(LIFE, CellRule.apply_rule_binary).root is not None
+
+
+def test_engine_is_compacted():
+    class SmallHashLifeTensor(HashLifeTensor):
+        max_nodes = 1
+    state = SmallHashLifeTensor.from_tensor(glider())
+    expected = HashLifeTensor.from_tensor(glider())
+    for _ in range(3):
+        state = state.step_n(LIFE, CellRule.apply_rule_binary, 16)
+        expected = expected.step_n(LIFE, CellRule.apply_rule_binary, 16)
+    assert state.to_tensor().not_null_points_global == expected.to_tensor().not_null_points_global
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+import kernels
+from tensor import LocatedTensor
+from rule import CellRule
+
+
+pytestmark = pytest.mark.skipif(not kernels.available, reason="numba isn't installed")
+
+
+@pytest.fixture
+def numpy_path():
+    """ turn off the kernels while the test computes the numpy result """
+    def compute(func):
+        kernels.enabled = False
+        try:
+            return func()
+        finally:
+            kernels.enabled = True
+    return compute
+
+
+def random_tensor(seed, dim=(11, 9, 13), dtype=np.uint16):
+    rng = np.random.default_rng(seed)
+    value = rng.choice([0, 0, 1, 2, 7], size=dim).astype(dtype)
+    return LocatedTensor(tuple(int(x) for x in rng.integers(-5, 5, 3)), value)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_num_alive(seed, numpy_path):
+    tensor = random_tensor(seed)
+    expected = numpy_path(tensor.num_alive)
+    result = tensor.num_alive()
+    assert result.dtype == expected.dtype
+    assert np.array_equal(result[:], expected[:])
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_hollow(seed, numpy_path):
+    tensor = random_tensor(seed)
+    tensor[tensor[:] != 0] = 1
+    assert np.array_equal(tensor.hollow()[:], numpy_path(tensor.hollow)[:])
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("apply_func", [CellRule.apply_rule_binary, CellRule.apply_rule_lifetime])
+def test_next_life(seed, apply_func, numpy_path):
+    tensor = random_tensor(seed, dtype=np.uint8)
+    rng = np.random.default_rng(seed)
+    codes = [CellRule.get_code([4], [4, 5]), CellRule.get_code([5, 6], [4, 5, 6, 7]), 0]
+    rules = LocatedTensor(tuple(tensor.corner + 1), rng.choice(codes, size=(10, 10, 10)))
+    expected = numpy_path(lambda: tensor.next_life(rules, apply_func))
+    result = tensor.next_life(rules, apply_func)
+    assert result.dtype == expected.dtype
+    assert np.array_equal(result[:], expected[:])
+
+
+def test_lifetime_saturation(numpy_path):
+    tensor = LocatedTensor((0, 0, 0), np.full((4, 4, 4), 255, dtype=np.uint8))
+    code = CellRule.get_code(list(range(27)))
+    expected = numpy_path(lambda: tensor.next_life(code, CellRule.apply_rule_lifetime))
+    result = tensor.next_life(code, CellRule.apply_rule_lifetime)
+    assert np.array_equal(result[:], expected[:])
+    assert (result[:] == 255).all()
+
+
+def test_numpy_path_is_local_to_the_thread():
+    with kernels.numpy_path():
+        assert not kernels.supports(3)
+    assert kernels.supports(3)
+
+
+@pytest.mark.parametrize("in_place", [False, True])
+def test_workers_write_slabs(in_place):
+    tensor = random_tensor(7, dim=(20, 9, 13))
+    rules = LocatedTensor(tuple(tensor.corner), np.full(tensor.dim, CellRule.get_code([4], [4, 5])))
+    expected = tensor.next_life(rules, CellRule.apply_rule_lifetime)
+    out = tensor if in_place else None
+    result = tensor.next_life(rules, CellRule.apply_rule_lifetime, out=out, workers=3)
+    assert np.array_equal(result[:], expected[:])
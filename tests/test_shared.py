@@ -0,0 +1,47 @@
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+import numpy as np
+from tensor import LocatedTensor
+from rule import CellRule
+from shared import SharedTensor
+
+CODE = CellRule.get_code([4], [4, 5])
+ROOT = Path(__file__).parents[1]
+
+
+def test_steps_match_located_tensor():
+    rng = np.random.default_rng(0)
+    expected = LocatedTensor((0, 0, 0), rng.choice([0, 1], size=(12, 8, 8)).astype(np.uint16))
+    rules = LocatedTensor((0, 0, 0), np.full((12, 8, 8), CODE))
+    shared = SharedTensor.from_tensor(expected, workers=2)
+    try:
+        for _ in range(4):
+            shared = shared.next_life(rules, CellRule.apply_rule_lifetime)
+            expected = expected.next_life(rules, CellRule.apply_rule_lifetime)
+            assert np.array_equal(shared.to_tensor()[:], expected[:])
+    finally:
+        shared.close()
+
+
+def test_script_without_main_guard(tmp_path):
+    script = tmp_path / "script.py"
+    script.write_text(textwrap.dedent(f"""
+        import sys
+        sys.path.insert(0, {str(ROOT)!r})
+        import numpy as np
+        from tensor import LocatedTensor
+        from rule import CellRule
+        from shared import SharedTensor
+        from virtual import VirtualLife, VirtualConstant
+        print("started")
+        rules = VirtualConstant(LocatedTensor((0, 0, 0), np.full((12, 8, 8), {CODE})))
+        init = VirtualConstant(LocatedTensor((0, 0, 0), np.random.default_rng(0).choice([0, 1], size=(12, 8, 8))))
+        life = VirtualLife(rules, init, backend=SharedTensor)
+        for _ in range(3):
+            life.compute()
+    """))
+    result = subprocess.run([sys.executable, str(script)], capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.count("started") == 1  # the workers don't run the script again
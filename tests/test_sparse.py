@@ -0,0 +1,27 @@
+import numpy as np
+from tensor import LocatedTensor
+from sparse import SparseTensor
+from rule import CellRule
+
+
+def random_tensor(shape, seed=0):
+    return LocatedTensor((0,) * len(shape), np.random.default_rng(seed).choice([0, 1], size=shape).astype(np.uint16))
+
+
+def test_int_rule_matches_located_tensor():
+    code = CellRule.get_code([4], [4, 5])
+    expected = random_tensor((8, 8, 8))
+    sparse = SparseTensor.from_tensor(expected)
+    for _ in range(3):
+        expected = expected.next_life(code, CellRule.apply_rule_lifetime)
+        sparse = sparse.next_life(code, CellRule.apply_rule_lifetime)
+        assert np.array_equal(sparse.to_tensor()[:], expected[:])
+
+
+def test_int_rule_which_births_from_nothing():
+    code = CellRule.get_code([0, 1], [1], ndim=2)
+    tensor = random_tensor((5, 5))
+    expected = tensor.next_life(code, CellRule.apply_rule_binary)
+    result = SparseTensor.from_tensor(tensor).next_life(code, CellRule.apply_rule_binary)
+    assert np.array_equal(result.to_tensor()[:], expected[:])
+    assert not SparseTensor.from_tensor(tensor).next_life(0, CellRule.apply_rule_binary).to_tensor()[:].any()
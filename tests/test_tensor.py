@@ -0,0 +1,68 @@
+import pytest
+import numpy as np
+from tensor import LocatedTensor
+from sparse import SparseTensor
+
+
+def test_addition_saturates_instead_of_wrapping():
+    t1 = LocatedTensor((0, 0), np.full((2, 2), 200, dtype=np.uint8))
+    t2 = LocatedTensor((1, 1), np.full((2, 2), 200, dtype=np.uint8))
+    result = t1 + t2
+    assert result.dtype == np.uint8
+    assert result[1, 1] == 255 and result[0, 0] == 200 and result[2, 2] == 200
+    assert ((t1 + 100)[:] == 255).all()
+    assert ((t1 + 300)[:] == 500).all()  # number which doesn't fit widens the type
+
+
+def test_inplace_addition_saturates():
+    tensor = LocatedTensor((0, 0), np.full((2, 2), 250, dtype=np.uint8))
+    same = tensor
+    tensor += 10
+    assert tensor is same and (tensor[:] == 255).all()
+
+
+def test_subtraction_is_signed():
+    t1 = LocatedTensor((0, 0), np.zeros((2, 2), dtype=np.uint8))
+    assert ((t1 - 1)[:] == -1).all()
+
+
+def test_sparse_addition_saturates():
+    t1 = SparseTensor.from_tensor(LocatedTensor((0, 0), np.full((2, 2), 200, dtype=np.uint8)))
+    assert ((t1 + t1).to_tensor()[:] == 255).all()
+
+
+def test_morphology_with_zero_radius_is_a_copy():
+    tensor = LocatedTensor((0, 0, 0), np.ones((3, 3, 3), dtype=np.uint8))
+    for result in (tensor.dilate(0), tensor.erode(0), tensor.opening(0), tensor.closing(0)):
+        assert np.array_equal(result[:], tensor[:])
+        result[1, 1, 1] = 5
+        assert tensor[1, 1, 1] == 1
+
+
+def test_morphology_rejects_negative_radius():
+    tensor = LocatedTensor((0, 0, 0), np.ones((3, 3, 3), dtype=np.uint8))
+    with pytest.raises(ValueError):
+        tensor.erode(-1)
+
+
+def test_inplace_logic_keeps_wide_values():
+    tensor = LocatedTensor((0, 0), np.zeros((2, 2), dtype=np.uint8))
+    other = LocatedTensor((0, 0), np.full((1, 1), 300))
+    result = tensor.union_(other)
+    assert result is not tensor and result[0, 0] == 300
+    small = LocatedTensor((0, 0), np.full((1, 1), 7, dtype=np.uint8))
+    assert tensor.union_(small) is tensor and tensor[0, 0] == 7
+
+
+def test_output_of_narrow_type_is_rejected():
+    tensor = LocatedTensor((0, 0), np.zeros((2, 2), dtype=np.uint8))
+    other = LocatedTensor((0, 0), np.full((2, 2), 300))
+    with pytest.raises(TypeError):
+        tensor.union(other, out=tensor)
+    with pytest.raises(TypeError):
+        tensor.fill(300, out=tensor)
+
+
+def test_num_alive_in_6d():
+    tensor = LocatedTensor((0,) * 6, np.ones((3,) * 6, dtype=np.uint8))
+    assert tensor.num_alive()[(1,) * 6] == 3 ** 6 - 1
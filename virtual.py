@@ -4,6 +4,7 @@ try:
 except ImportError:
     pass  # utils module works only inside blender, so we skip it for the test purposes
 import hashlib
+from functools import partial
 from tensor import LocatedTensor
 from copy import copy
 from rule import CellRule
@@ -94,8 +95,9 @@ class VirtualFunction:
     def fill(self, value):
         return VirtualFunction(LocatedTensor.fill, self, VirtualConstant(value))
 
-    def random_fill(self, values, weights=None):
-        return VirtualFunction(LocatedTensor.random_fill, self, VirtualConstant(values), VirtualConstant(weights))
+    def random_fill(self, values, weights=None, seed=None):
+        return VirtualFunction(LocatedTensor.random_fill, self, VirtualConstant(values), VirtualConstant(weights),
+                               VirtualConstant(seed))
 
     def hollow(self):
         return VirtualFunction(LocatedTensor.hollow, self)
@@ -106,6 +108,30 @@ class VirtualFunction:
     def mirror(self):
         return VirtualFunction(LocatedTensor.mirror, self)
 
+    def translate(self, offset):
+        return VirtualFunction(LocatedTensor.translate, self, VirtualConstant(offset))
+
+    def crop_to_content(self):
+        return VirtualFunction(LocatedTensor.crop_to_content, self)
+
+    def pad(self, margin):
+        return VirtualFunction(LocatedTensor.pad, self, VirtualConstant(margin))
+
+    def dilate(self, radius=1, connectivity=26):
+        return VirtualFunction(LocatedTensor.dilate, self, VirtualConstant(radius), VirtualConstant(connectivity))
+
+    def erode(self, radius=1, connectivity=26):
+        return VirtualFunction(LocatedTensor.erode, self, VirtualConstant(radius), VirtualConstant(connectivity))
+
+    def opening(self, radius=1, connectivity=26):
+        return VirtualFunction(LocatedTensor.opening, self, VirtualConstant(radius), VirtualConstant(connectivity))
+
+    def closing(self, radius=1, connectivity=26):
+        return VirtualFunction(LocatedTensor.closing, self, VirtualConstant(radius), VirtualConstant(connectivity))
+
+    def shell(self, thickness=1, connectivity=6):
+        return VirtualFunction(LocatedTensor.shell, self, VirtualConstant(thickness), VirtualConstant(connectivity))
+
 
 # ==================================== #
 # ======= 2. VirtualConstant ========= #
@@ -122,6 +148,11 @@ class VirtualConstant(VirtualFunction):
         self.__value = value  # it can be single int value or ndarray tensor, so we don't use __tensor
 
     def hash(self):
+        """ tensors and arrays are hashed by their raw values (str of a big array is abbreviated by numpy) """
+        if isinstance(self.__value, LocatedTensor):
+            return self.__value.fingerprint()
+        if isinstance(self.__value, np.ndarray):
+            return LocatedTensor.fingerprint_of(self.__value)
         hash_object = hashlib.sha256(str(self.__value).encode())
         return hash_object.hexdigest()
 
@@ -210,17 +241,54 @@ class VirtualLife(VirtualFunction):
     Implementation of John Conway's Game of Life
     """
 
-    def __init__(self, rules_function, initial_function=None, lifetime=True):
+    def __init__(self, rules_function, initial_function=None, lifetime=True, backend=LocatedTensor, dtype=None,
+                 generations_per_tick=1, cycle_window=0, workers=1, neighborhood=None, states=0):
         """
         param virtual_function is virtual function which return tensor with rules in each cell of the tensor
         param initial_function is virtual function which return tensor for initialization __tensor_values
+        param backend is class of tensor which keeps values between steps (LocatedTensor, SparseTensor,
+        ChunkedTensor, BitTensor, FrontierTensor, HashLifeTensor or SharedTensor), it must implement from_tensor,
+        rules_from_tensor, to_tensor and next_life (SharedTensor forks its worker processes on linux, on other
+        platforms they are spawned, so the script must be under if __name__ == "__main__" there)
+        param dtype is type of the values kept by LocatedTensor backend (lifetime stops at its maximum),
+        uint16 by default (uint8 for Generations rules)
+        param generations_per_tick is number of generations computed by each call of compute (only the final one
+        is returned, rules_function is computed once for all of them)
+        param cycle_window is number of the last ticks which fingerprints are kept to find repeated state (0 - off),
+        when state is repeated the cycle is replayed from the cache until the rules are changed
+        (values are compared with lifetime, so lifetime states are repeated only after saturation)
+        param workers is number of threads which compute slabs of LocatedTensor backend in parallel by the numpy
+        path (numba kernels are parallel themselves, so they are used only with 1 worker)
+        param neighborhood is set of the neighbors (Neighborhood) for LocatedTensor backend, the codes of the rules
+        must be encoded for it (CellRule.get_code(..., neighborhood=neighborhood)), the usual one by default
+        param states is number of states of Generations rules for LocatedTensor backend (0 - off, lifetime is ignored
+        otherwise): alive cell which doesn't survive passes through dying states before it becomes dead
+        (see CellRule.apply_rule_generations)
         """
+        if lifetime and getattr(backend, "binary", False):
+            raise ValueError("Backend keeps only binary values, so it can be used only with lifetime=False")
+        if neighborhood is not None and backend is not LocatedTensor:
+            raise ValueError("Only LocatedTensor backend can count other neighborhoods")
+        if states and backend is not LocatedTensor:
+            raise ValueError("Only LocatedTensor backend can apply Generations rules")
         super().__init__(None, None)  # we use self.virtual_function for the only children
         self.rules_function = rules_function
         self.initial_function = initial_function
         self.lifetime = lifetime
+        self.backend = backend
+        self.dtype = dtype if dtype is not None else np.uint8 if states else np.uint16
+        self.generations_per_tick = generations_per_tick
+        self.workers = workers
+        self.neighborhood = neighborhood
+        self.states = states
         self.__tensor_rules = None
+        self.__backend_rules = None
         self.__tensor_values = None
+        self.__buffers = None  # two preallocated tensors for the values, one for the neighbors and spare one
+        self.cycle_window = cycle_window
+        self.__history = {}  # fingerprint of the state -> seq of its last occurrence
+        self.__history_rules = None  # rules which the history is collected for
+        self.__cycle = None  # (seq of the first occurrence, period, seq of the first frame, cached frames)
         self.seq = 0
 
     def hash(self):
@@ -235,13 +303,117 @@ class VirtualLife(VirtualFunction):
         """ compute rules, initial values, next life and keep results """
         self.__tensor_rules = self.rules_function.tensor()
         self.seq += 1
-        if self.seq == 1:
-            if self.initial_function:
-                self.__tensor_values = self.initial_function.tensor()  # set initial values
-                return self.__tensor_values
-            else:
+        if self.cycle_window:
+            replayed = self.__replay()
+            if replayed is not None:
+                return replayed
+        if self.seq == 1 and self.initial_function:
+            self.__tensor_values = self.initial_function.tensor()  # set initial values
+            result = self.__tensor_values
+        else:
+            if self.seq == 1:
                 self.__tensor_values = copy(self.__tensor_rules)  # we can have no values at first step
                 self.__tensor_values[:] = 0  # or .fill(0) ?
-        apply_func = CellRule.apply_rule_lifetime if self.lifetime else CellRule.apply_rule_binary
-        self.__tensor_values = self.__tensor_values.next_life(self.__tensor_rules, apply_func)
+            if self.states:
+                apply_func = partial(CellRule.apply_rule_generations, states=self.states)
+            else:
+                apply_func = CellRule.apply_rule_lifetime if self.lifetime else CellRule.apply_rule_binary
+            if self.backend is LocatedTensor:
+                result = self.__compute_buffered(apply_func)
+            else:
+                result = self.__compute_backend(apply_func)
+        if self.cycle_window:
+            self.__detect_cycle(result)
+        return result
+
+    @property
+    def cycle_period(self):
+        """ period of the detected cycle in ticks (None if the cycle isn't detected) """
+        return None if self.__cycle is None else self.__cycle[1]
+
+    @property
+    def cycle_start(self):
+        """ seq of the first occurrence of the repeated state (None if the cycle isn't detected) """
+        return None if self.__cycle is None else self.__cycle[0]
+
+    def __is_same_rules(self, tensor_rules):
+        """ check if the rules are the same as the rules of the history """
+        if isinstance(tensor_rules, LocatedTensor):
+            return tensor_rules is self.__history_rules
+        return not isinstance(self.__history_rules, LocatedTensor) and tensor_rules == self.__history_rules
+
+    def __replay(self):
+        """ cached frame of the cycle (None if the cycle isn't detected yet or the rules are changed) """
+        if not self.__is_same_rules(self.__tensor_rules):  # the next step is computed from the last frame
+            self.__history = {}
+            self.__history_rules = self.__tensor_rules
+            self.__cycle = None
+            return None
+        if self.__cycle is None or len(self.__cycle[3]) < self.__cycle[1]:
+            return None
+        start, period, first_frame, frames = self.__cycle
+        self.__tensor_values = frames[(self.seq - first_frame) % period]
         return self.__tensor_values
+
+    def __detect_cycle(self, tensor):
+        """ keep fingerprint of the state, start the cycle when it's repeated and cache the frames of the cycle """
+        if self.__cycle is not None:
+            self.__cycle[3].append(copy(tensor))  # frames are recorded while the cycle is passed once
+            return
+        fingerprint = tensor.fingerprint()
+        last_seq = self.__history.get(fingerprint)
+        if last_seq is not None and self.seq - last_seq <= self.cycle_window:
+            self.__cycle = (last_seq, self.seq - last_seq, self.seq, [copy(tensor)])
+            return
+        self.__history[fingerprint] = self.seq
+        if len(self.__history) > self.cycle_window:  # forget fingerprints out of the window
+            self.__history = {key: seq for key, seq in self.__history.items() if self.seq - seq < self.cycle_window}
+
+    def __compute_buffered(self, apply_func):
+        """
+        next life is written into one of two preallocated buffers in turn (ping-pong),
+        so the returned tensor stays valid until the next but one step.
+        buffers are created again only when location of the rules is changed
+        """
+        tensor_rules = self.__tensor_rules
+        generations = self.generations_per_tick
+        alive_state = 1 if self.states else None  # only alive state of Generations rules is counted as neighbor
+        if not isinstance(tensor_rules, LocatedTensor):  # rules are given by number, so there is no location
+            self.__tensor_values = self.__tensor_values.step_n(tensor_rules, apply_func, generations, dtype=self.dtype,
+                                                               workers=self.workers, neighborhood=self.neighborhood,
+                                                               alive_state=alive_state)
+            return self.__tensor_values
+        location = (tuple(tensor_rules.corner), tensor_rules.dim)
+        if self.__buffers is None or self.__buffers[0] != location:
+            buffers = [LocatedTensor.zeros(location[0], dim=location[1], dtype=self.dtype) for _ in range(2)]
+            count_dtype = LocatedTensor.count_dtype(tensor_rules.ndim, self.neighborhood)
+            buffers.append(LocatedTensor.zeros(location[0], dim=location[1], dtype=count_dtype))
+            buffers.append(None)  # spare buffer is needed only for several generations per tick
+            self.__buffers = (location, buffers)
+        values_a, values_b, neighbors, spare = self.__buffers[1]
+        if generations > 1 and spare is None:
+            spare = self.__buffers[1][3] = LocatedTensor.zeros(location[0], dim=location[1], dtype=self.dtype)
+        out = values_b if self.__tensor_values is values_a else values_a
+        self.__tensor_values = self.__tensor_values.step_n(tensor_rules, apply_func, generations, out=out,
+                                                           neighbors=neighbors, spare=spare, workers=self.workers,
+                                                           neighborhood=self.neighborhood, alive_state=alive_state)
+        return self.__tensor_values
+
+    def __compute_backend(self, apply_func):
+        """
+        next life by the backend tensor, rules are converted only when rules_function returns new tensor
+        (rules given by number are passed as is, so the ChunkedTensor applies them to the unbounded space)
+        """
+        tensor_rules = self.__tensor_rules
+        if isinstance(tensor_rules, LocatedTensor):
+            if self.__backend_rules is None or self.__backend_rules[0] is not tensor_rules:
+                self.__backend_rules = (tensor_rules, self.backend.rules_from_tensor(tensor_rules))
+            tensor_rules = self.__backend_rules[1]
+        if not isinstance(self.__tensor_values, self.backend):
+            self.__tensor_values = self.backend.from_tensor(self.__tensor_values)
+        if hasattr(self.__tensor_values, "step_n"):
+            self.__tensor_values = self.__tensor_values.step_n(tensor_rules, apply_func, self.generations_per_tick)
+        else:
+            for _ in range(self.generations_per_tick):
+                self.__tensor_values = self.__tensor_values.next_life(tensor_rules, apply_func)
+        return self.__tensor_values.to_tensor()  # only the final state is converted